@@ -0,0 +1,227 @@
+"""
+.. module:: cache.py
+   :synopsis: Client-side cache of decoded values.
+
+Values read from Redis can be kept in a local LRU cache, so repeated reads
+of hot keys does not have to go to the server and deserialize the value
+every time::
+
+    >>> from redish.cache import LocalCache
+    >>> db = Client(cache=LocalCache(maxsize=1000, ttl=30))
+    >>> db.cache.listen(db.api)
+
+Entries are invalidated when the key is written to by the same client,
+when the entry expires, and (if :meth:`LocalCache.listen` is used) when
+the key is modified by any other client, using Redis keyspace notifications.
+
+Values read from the server are stored with the :meth:`LocalCache.version`
+taken before the read, so a value is not cached if the key was
+invalidated while it was being read::
+
+    >>> version = cache.version()
+    >>> value = api.get(key)
+    >>> cache.set(key, value, version=version)
+
+"""
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class LocalCache(object):
+    """Bounded LRU cache with optional per-entry expiry.
+
+    Entries are stored by ``(key, field)``, where ``key`` is the name of
+    the key in Redis, and ``field`` is an optional sub-key (e.g. the key of
+    a hash field), so that all entries for a key can be invalidated at once.
+
+    :keyword maxsize: Maximum number of entries kept in the cache.
+        Default is ``1000``.
+    :keyword ttl: Number of seconds entries are valid for.
+        Default is to keep entries until they are evicted or invalidated.
+
+    **Note:** The cached objects are shared between readers, so
+    they must not be modified in-place.
+
+    .. attribute:: hits
+
+        Number of lookups served from the cache.
+
+    .. attribute:: misses
+
+        Number of lookups not found in the cache (or expired).
+
+    .. attribute:: evictions
+
+        Number of entries removed to keep the cache within :attr:`maxsize`.
+
+    .. attribute:: connected
+
+        ``False`` if :meth:`listen` was called, but the listener is not
+        currently subscribed to keyspace notifications.  No values are
+        served from the cache until it is.
+
+    """
+    maxsize = 1000
+    ttl = None
+    connected = True
+
+    #: Seconds to wait before the first attempt to reconnect the listener,
+    #: doubled after every failed attempt, up to :attr:`max_retry_interval`.
+    retry_interval = 0.1
+    max_retry_interval = 30.0
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.maxsize = maxsize or self.maxsize
+        self.ttl = ttl or self.ttl
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._fields = {}
+        self._mutex = threading.RLock()
+        self._listener = None
+        self._clock = 0
+        self._floor = 0
+        self._invalidated = OrderedDict()
+
+    def get(self, key, field=None):
+        """Get the cached value for ``key``.
+
+        :raises KeyError: if the key is not in the cache.
+
+        """
+        with self._mutex:
+            if not self.connected:
+                self.misses += 1
+                raise KeyError(key)
+            try:
+                value, expires = self._data.pop((key, field))
+            except KeyError:
+                self.misses += 1
+                raise
+            if expires is not None and expires < time.time():
+                self._forget(key, field)
+                self.misses += 1
+                raise KeyError(key)
+            self._data[(key, field)] = (value, expires)
+            self.hits += 1
+            return value
+
+    def version(self):
+        """Return the current version of the cache, to pass to :meth:`set`
+        for a value read from the server after this call."""
+        return self._clock
+
+    def set(self, key, value, field=None, version=None):
+        """Store ``value`` for ``key`` in the cache.
+
+        :keyword version: The :meth:`version` of the cache before
+            ``value`` was read.  The value is not stored if ``key`` has
+            been invalidated since.
+
+        """
+        expires = self.ttl and time.time() + self.ttl or None
+        with self._mutex:
+            if not self.connected:
+                return
+            if version is not None and (version < self._floor or
+                    self._invalidated.get(key, 0) > version):
+                return
+            self._data.pop((key, field), None)
+            self._data[(key, field)] = (value, expires)
+            self._fields.setdefault(key, set()).add(field)
+            while len(self._data) > self.maxsize:
+                (old_key, old_field), _ = self._data.popitem(last=False)
+                self._forget(old_key, old_field)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Remove all entries for ``key`` from the cache."""
+        with self._mutex:
+            for field in self._fields.pop(key, ()):
+                self._data.pop((key, field), None)
+            self._clock += 1
+            self._invalidated.pop(key, None)
+            self._invalidated[key] = self._clock
+            if len(self._invalidated) > self.maxsize:
+                _, clock = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, clock)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._mutex:
+            self._data.clear()
+            self._fields.clear()
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+
+    def _forget(self, key, field):
+        self._data.pop((key, field), None)
+        fields = self._fields.get(key)
+        if fields is not None:
+            fields.discard(field)
+            if not fields:
+                self._fields.pop(key, None)
+
+    def listen(self, api, db=None):
+        """Invalidate entries when keys are modified by other clients.
+
+        Starts a background thread subscribing to the keyspace
+        notifications of database ``db`` (default is the database
+        of ``api``), using the redis-py client ``api``.
+
+        The server must be configured to send keyspace notifications,
+        (e.g. ``CONFIG SET notify-keyspace-events KA``).
+
+        If the connection is lost, the cache is cleared, and no values
+        are served from it until the listener has subscribed again.
+
+        """
+        if self._listener is not None:
+            return self._listener
+        if db is None:
+            db = api.connection_pool.connection_kwargs.get("db") or 0
+        self.connected = False
+        self._listener = threading.Thread(target=self._listen,
+                                          args=(api, db))
+        self._listener.setDaemon(True)
+        self._listener.start()
+        return self._listener
+
+    def _listen(self, api, db):
+        interval = self.retry_interval
+        while True:
+            pubsub = api.pubsub()
+            try:
+                pubsub.psubscribe("__keyspace@%s__:*" % (db, ))
+                for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.invalidate(message["channel"].split(":", 1)[1])
+                    elif message["type"] == "psubscribe":
+                        # (Re)subscribed: changes may have been missed.
+                        with self._mutex:
+                            self.clear()
+                            self.connected = True
+                        interval = self.retry_interval
+            except Exception:
+                pass
+            with self._mutex:
+                self.connected = False
+                self.clear()
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_retry_interval)
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``"""
+        return len(self._data)
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<LocalCache: %s/%s hits=%s misses=%s evictions=%s>" % (
+                len(self), self.maxsize,
+                self.hits, self.misses, self.evictions)
@@ -1,12 +1,118 @@
+import time
+
 from redis import Redis as _RedisClient
 from redis.exceptions import ResponseError
 
 from redish import types
-from redish.utils import mkey
+from redish.utils import mkey, chunks, Script
 from redish.serialization import Pickler
 
 DEFAULT_PORT = 6379
 
+#: Get and delete keys in a single atomic operation.
+#: Used if the server does not support the ``GETDEL`` command.
+POP_SCRIPT = Script("""
+    local values = {}
+    for i, key in ipairs(KEYS) do
+        local value = redis.call('GET', key)
+        if value then
+            redis.call('DEL', key)
+        end
+        values[i] = value
+    end
+    return values
+""")
+
+
+class _PendingReply(object):
+    """Placeholder for the reply of a command buffered in a
+    :class:`Batch`, which is not available until the batch is flushed.
+
+    Using it (except for :func:`repr`) raises :exc:`TypeError`.
+
+    """
+
+    def _unavailable(self, *args, **kwargs):
+        raise TypeError("Replies are not available in batch mode.")
+    __nonzero__ = __len__ = __iter__ = __getitem__ = _unavailable
+    __int__ = __long__ = __float__ = __str__ = __unicode__ = _unavailable
+    __add__ = __radd__ = __sub__ = __rsub__ = _unavailable
+    __cmp__ = __eq__ = __ne__ = __lt__ = __gt__ = _unavailable
+    __hash__ = _unavailable
+
+    def __repr__(self):
+        return "<pending batch reply>"
+
+
+class _BatchCache(object):
+    """Cache used by :class:`Batch`.
+
+    Invalidations of the underlying :class:`~redish.cache.LocalCache`
+    are deferred until the batch is flushed, so that values are not
+    cached again before the writes have reached the server.
+
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.keys = set()
+        self.cleared = False
+
+    def invalidate(self, key):
+        self.keys.add(key)
+
+    def clear(self):
+        self.cleared = True
+
+    def apply(self):
+        """Invalidate the keys written since the last call."""
+        if self.cleared:
+            self.cache.clear()
+        else:
+            map(self.cache.invalidate, self.keys)
+        self.reset()
+
+    def reset(self):
+        self.keys.clear()
+        self.cleared = False
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
+class _BatchPipeline(object):
+    """Pipeline used by :class:`Batch`.
+
+    Commands are buffered in the underlying pipeline, and flushed
+    by the owning batch every ``autoflush`` commands.  Nested calls to
+    :meth:`pipeline` and :meth:`execute` (as done by the datatypes in
+    :mod:`redish.types`) are folded into the batch.
+
+    """
+
+    def __init__(self, batch, pipe):
+        self.batch = batch
+        self.pipe = pipe
+
+    def pipeline(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        return []
+
+    def __getattr__(self, name):
+        command = getattr(self.pipe, name)
+        if not callable(command):
+            return command
+
+        def buffered(*args, **kwargs):
+            command(*args, **kwargs)
+            self.batch._maybe_flush()
+            return _PendingReply()
+        buffered.__name__ = name
+        return buffered
+
+
 
 class Client(object):
     """Redis Client
@@ -21,6 +127,19 @@ class Client(object):
         Must support the methods ``serialize(value)`` and
         ``deserialize(value)``. The default is to use
         :class:`redish.serialization.Pickler`.
+    :keyword cache: Optional :class:`redish.cache.LocalCache` instance
+        used to cache decoded values locally.  Default is to not
+        use a cache.
+
+    .. attribute:: scan_count
+
+        Number of keys the server should examine for every ``SCAN``
+        call when iterating over keys.  Default is ``1000``.
+
+    .. attribute:: chunksize
+
+        Maximum number of values fetched for every ``MGET`` call when
+        iterating over values.  Default is ``1000``.
 
     """
 
@@ -29,12 +148,19 @@ class Client(object):
     db = None
     serializer = Pickler()
     #serializer = anyjson
+    cache = None
+    counter_buffer = None
+    scan_count = 1000
+    chunksize = 1000
+    supports_getdel = True
 
     def __init__(self, host=None, port=None, db=None,
-            serializer=None, **kwargs):
+            serializer=None, cache=None, **kwargs):
         self.host = host or self.host
         self.port = port or self.port
         self.serializer = serializer or self.serializer
+        if cache is not None:
+            self.cache = cache
         self.db = db or self.db
         self.api = _RedisClient(self.host, self.port, self.db, **kwargs)
 
@@ -42,46 +168,164 @@ class Client(object):
         """Return the next id for a name."""
         return types.Id(name, self.api)
 
-    def List(self, name, initial=None):
+    def Int(self, name, buffered=False, staleness=None):
+        """The integer (counter) datatype.
+
+        :param name: The name of the counter.
+        :keyword buffered: If enabled, increments are buffered locally
+            and sent in bulk, using a buffer shared by all the buffered
+            counters of this client. See :class:`redish.types.BufferedInt`.
+        :keyword staleness: Number of seconds a buffered counter can
+            cache the value read from the server.
+
+        See :class:`redish.types.Int`.
+
+        """
+        if not buffered:
+            return types.Int(name, self.api)
+        if self.counter_buffer is None:
+            self.counter_buffer = types.CounterBuffer(self.api)
+        return types.BufferedInt(name, self.api, buffer=self.counter_buffer,
+                                 staleness=staleness)
+
+    def Float(self, name):
+        """The float (counter) datatype.
+
+        :param name: The name of the counter.
+
+        See :class:`redish.types.Float`.
+
+        """
+        return types.Float(name, self.api)
+
+    def StripedCounter(self, name, stripes=None, staleness=None):
+        """A counter spread over several keys, for counters updated
+        by many clients at once.
+
+        :param name: The name of the counter.
+        :keyword stripes: Number of keys the counter is spread over.
+        :keyword staleness: Number of seconds the total can be cached.
+
+        See :class:`redish.types.StripedCounter`.
+
+        """
+        return types.StripedCounter(name, self.api, stripes=stripes,
+                                    staleness=staleness)
+
+    def List(self, name, initial=None, serializer=None):
         """The list datatype.
 
         :param name: The name of the list.
         :keyword initial: Initial contents of the list.
+        :keyword serializer: Serializer used for the items in the list.
+            Default is to use :attr:`serializer`.
 
         See :class:`redish.types.List`.
 
         """
-        return types.List(name, self.api, initial=initial)
+        return types.List(name, self.api, initial=initial,
+                          serializer=serializer or self.serializer)
 
-    def Set(self, name, initial=None):
+    def Set(self, name, initial=None, serializer=None):
         """The set datatype.
 
         :param name: The name of the set.
         :keyword initial: Initial members of the set.
+        :keyword serializer: Serializer used for the members of the set.
+            Default is to use :attr:`serializer`.
 
         See :class:`redish.types.Set`.
 
         """
-        return types.Set(name, self.api, initial)
+        return types.Set(name, self.api, initial,
+                         serializer=serializer or self.serializer)
 
 
-    def SortedSet(self, name, initial=None):
+    def SortedSet(self, name, initial=None, serializer=None):
         """The sorted set datatype.
 
         :param name: The name of the sorted set.
         :param initial: Initial members of the set as an iterable
            of ``(element, score)`` tuples.
+        :keyword serializer: Serializer used for the members of the set.
+            Default is to use :attr:`serializer`.
 
         See :class:`redish.types.SortedSet`.
 
         """
-        return types.SortedSet(name, self.api, initial)
+        return types.SortedSet(name, self.api, initial,
+                               serializer=serializer or self.serializer)
+
+    def HyperLogLog(self, name, initial=None, serializer=None):
+        """The HyperLogLog datatype, counting unique members.
+
+        :param name: The name of the counter.
+        :param initial: Initial members to add.
+        :keyword serializer: Serializer used to encode the members.
+            Default is to use :attr:`serializer`.
+
+        See :class:`redish.types.HyperLogLog`.
+
+        """
+        return types.HyperLogLog(name, self.api, initial,
+                                 serializer=serializer or self.serializer)
+
+    def BitSet(self, name, initial=None):
+        """The bitset datatype (a set of integers stored as a bitmap).
+
+        :param name: The name of the bitset.
+        :param initial: Initial members (bit offsets) of the set.
 
-    def Dict(self, name, initial=None, **extra):
+        See :class:`redish.types.BitSet`.
+
+        """
+        return types.BitSet(name, self.api, initial)
+
+    def BloomFilter(self, name, capacity=None, error_rate=None,
+            serializer=None):
+        """The Bloom filter datatype (probabilistic set membership).
+
+        :param name: The name of the filter.
+        :keyword capacity: Expected number of members.
+        :keyword error_rate: Acceptable rate of false positives.
+        :keyword serializer: Serializer used to encode the members.
+            Default is to use :attr:`serializer`.
+
+        See :class:`redish.types.BloomFilter`.
+
+        """
+        return types.BloomFilter(name, self.api, capacity=capacity,
+                                 error_rate=error_rate,
+                                 serializer=serializer or self.serializer)
+
+    def MirroredSortedSet(self, name, initial=None, serializer=None,
+            **kwargs):
+        """A sorted set with a local replica serving reads.
+
+        :param name: The name of the sorted set.
+        :param initial: Initial members of the set as an iterable
+           of ``(element, score)`` tuples.
+        :keyword serializer: Serializer used for the members of the set.
+            Default is to use :attr:`serializer`.
+        :keyword resync_interval: Maximum number of seconds between
+            full reloads of the replica.
+        :keyword listen: Listen for changes made by other clients.
+
+        See :class:`redish.types.MirroredSortedSet`.
+
+        """
+        return types.MirroredSortedSet(name, self.api, initial,
+                                       serializer=serializer or
+                                                  self.serializer,
+                                       **kwargs)
+
+    def Dict(self, name, initial=None, serializer=None, **extra):
         """The dictionary datatype (Hash).
 
         :param name: The name of the dictionary.
         :keyword initial: Initial contents.
+        :keyword serializer: Serializer used for the values of the
+            dictionary.  Default is to use :attr:`serializer`.
         :keyword \*\*extra: Initial contents as keyword arguments.
 
         The ``initial``, and ``**extra`` keyword arguments
@@ -90,30 +334,114 @@ class Client(object):
         See :class:`redish.types.Dict`.
 
         """
-        return types.Dict(name, self.api, initial=initial, **extra)
+        return types.Dict(name, self.api, initial=initial,
+                          cache=self.cache,
+                          serializer=serializer or self.serializer, **extra)
 
-    def Queue(self, name, initial=None, maxsize=None):
+    def Queue(self, name, initial=None, maxsize=None, serializer=None):
         """The queue datatype.
 
         :param name: The name of the queue.
         :keyword initial: Initial items in the queue.
+        :keyword serializer: Serializer used for the items in the queue.
+            Default is to use :attr:`serializer`.
 
         See :class:`redish.types.Queue`.
 
         """
-        return types.Queue(name, self.api, initial=initial, maxsize=maxsize)
+        return types.Queue(name, self.api, initial=initial, maxsize=maxsize,
+                           serializer=serializer or self.serializer)
 
-    def LifoQueue(self, name, initial=None, maxsize=None):
+    def LifoQueue(self, name, initial=None, maxsize=None, serializer=None):
         """The LIFO queue datatype.
 
         :param name: The name of the queue.
         :keyword initial: Initial items in the queue.
+        :keyword serializer: Serializer used for the items in the queue.
+            Default is to use :attr:`serializer`.
 
         See :class:`redish.types.LifoQueue`.
 
         """
         return types.LifoQueue(name, self.api,
-                               initial=initial, maxsize=maxsize)
+                               initial=initial, maxsize=maxsize,
+                               serializer=serializer or self.serializer)
+
+    def PriorityQueue(self, name, initial=None, maxsize=None,
+            serializer=None):
+        """The priority queue datatype.
+
+        :param name: The name of the queue.
+        :keyword initial: Initial items in the queue, as an iterable
+            of ``(item, priority)`` tuples.
+        :keyword serializer: Serializer used for the items in the queue.
+            Default is to use :attr:`serializer`.
+
+        See :class:`redish.types.PriorityQueue`.
+
+        """
+        return types.PriorityQueue(name, self.api,
+                                   initial=initial, maxsize=maxsize,
+                                   serializer=serializer or self.serializer)
+
+    def DelayedQueue(self, name, initial=None, serializer=None):
+        """The delayed queue datatype.
+
+        :param name: The name of the queue.
+        :keyword initial: Initial items in the queue, as an iterable
+            of ``(item, eta)`` tuples.
+        :keyword serializer: Serializer used for the items in the queue.
+            Default is to use :attr:`serializer`.
+
+        See :class:`redish.types.DelayedQueue`.
+
+        """
+        return types.DelayedQueue(name, self.api, initial=initial,
+                                  serializer=serializer or self.serializer)
+
+    def ReliableQueue(self, name, initial=None, maxsize=None,
+            serializer=None, **kwargs):
+        """The reliable queue datatype.
+
+        :param name: The name of the queue.
+        :keyword initial: Initial items in the queue.
+        :keyword serializer: Serializer used for the items in the queue.
+            Default is to use :attr:`serializer`.
+
+        Additional keyword arguments (``consumer``, ``prefetch``,
+        ``visibility_timeout``) are passed on to the queue.
+
+        See :class:`redish.types.ReliableQueue`.
+
+        """
+        return types.ReliableQueue(name, self.api,
+                                   initial=initial, maxsize=maxsize,
+                                   serializer=serializer or self.serializer,
+                                   **kwargs)
+
+    def batch(self, autoflush=None, raise_on_error=True):
+        """Buffer write commands and send them to the server in
+        a single pipeline.
+
+        :keyword autoflush: Flush the pipeline every ``autoflush``
+            commands.  Default is to only flush when the block exits.
+        :keyword raise_on_error: Raise the first error returned by the
+            server when flushing.  If disabled the exception instances
+            are only available in :attr:`Batch.results`.
+
+        Example::
+
+            >>> with db.batch() as b:
+            ...     b["foo"] = "bar"
+            ...     b.List("mylist").extend(["a", "b", "c"])
+            >>> b.results
+            [True, 3]
+
+        See :class:`Batch`.
+
+        """
+        return Batch(self, autoflush=autoflush,
+                     raise_on_error=raise_on_error)
 
     def prepare_value(self, value):
         """Encode python object to be stored in the database."""
@@ -125,47 +453,118 @@ class Client(object):
 
     def clear(self):
         """Remove all keys from the current database."""
-        return self.api.flushdb()
+        result = self.api.flushdb()
+        if self.cache is not None:
+            self.cache.clear()
+        return result
 
-    def update(self, mapping):
-        """Update database with the key/values from a :class:`dict`."""
-        return self.api.mset(dict((key, self.prepare_value(value))
-                                for key, value in mapping.items()))
+    def _invalidate(self, name):
+        if self.cache is not None:
+            self.cache.invalidate(name)
+
+    def update(self, mapping, ttl=None, chunksize=None, callback=None):
+        """Update database with the key/values from a :class:`dict`.
+
+        :param mapping: A :class:`dict`, or any iterable of
+            ``(key, value)`` pairs (including generators).
+        :keyword ttl: Optional time to live for every key, in seconds.
+        :keyword chunksize: Maximum number of keys sent for every
+            round trip. Default is :attr:`chunksize`.
+        :keyword callback: Optional callback called after every
+            chunk has been sent, with the total number of keys stored so
+            far, and the number of seconds elapsed, as arguments.
+
+        The values are encoded and sent one chunk at a time, so
+        only a single chunk is kept in memory at any time.
+
+        Returns the number of keys stored.
+
+        """
+        if hasattr(mapping, "iteritems"):
+            mapping = mapping.iteritems()
+        encode = self.prepare_value
+        stored = 0
+        time_start = time.time()
+        pipe = self.api.pipeline(transaction=False)
+        for chunk in chunks(mapping, chunksize or self.chunksize):
+            if ttl is None:
+                pipe.mset(dict((key, encode(value)) for key, value in chunk))
+            else:
+                for key, value in chunk:
+                    pipe.execute_command("SETEX", key, int(ttl),
+                                         encode(value))
+            pipe.execute()
+            if self.cache is not None:
+                map(self.cache.invalidate, (key for key, _ in chunk))
+            stored += len(chunk)
+            if callback is not None:
+                callback(stored, time.time() - time_start)
+        return stored
 
     def rename(self, old_name, new_name):
         """Rename key to a new name."""
+        old_name, new_name = mkey(old_name), mkey(new_name)
         try:
-            self.api.rename(mkey(old_name), mkey(new_name))
+            self.api.rename(old_name, new_name)
         except ResponseError, exc:
             if "no such key" in exc.args:
                 raise KeyError(old_name)
             raise
+        finally:
+            self._invalidate(old_name)
+            self._invalidate(new_name)
 
     def keys(self, pattern="*"):
         """Get a list of all the keys in the database, or
         matching ``pattern``."""
         return self.api.keys(pattern)
 
+    def _scan(self, pattern="*", count=None):
+        cursor = 0
+        while True:
+            cursor, keys = self.api.execute_command("SCAN", cursor,
+                                "MATCH", pattern,
+                                "COUNT", count or self.scan_count)
+            for key in keys:
+                yield key
+            if not int(cursor):
+                break
+
     def iterkeys(self, pattern="*"):
         """An iterator over all the keys in the database, or matching
-        ``pattern``."""
-        return iter(self.keys(pattern))
+        ``pattern``.
+
+        The keyspace is traversed incrementally using ``SCAN``, so
+        this does not block the server, but a key may be returned
+        more than once if the database is modified during iteration.
+
+        """
+        return self._scan(pattern)
 
-    def iteritems(self, pattern="*"):
+    def iteritems(self, pattern="*", chunksize=None):
         """An iterator over all the ``(key, value)`` items in the database,
-        or where the keys matches ``pattern``."""
-        for key in self.keys(pattern):
-            yield (key, self[key])
+        or where the keys matches ``pattern``.
+
+        Values are fetched using ``MGET`` in chunks of ``chunksize``
+        keys (default is :attr:`chunksize`). Keys removed during
+        iteration, or not holding string values, are skipped.
+
+        """
+        decode = self.value_to_python
+        for keys in chunks(self._scan(pattern), chunksize or self.chunksize):
+            for key, value in zip(keys, self.api.mget(keys)):
+                if value is not None:
+                    yield (key, decode(value))
 
     def items(self, pattern="*"):
         """Get a list of all the ``(key, value)`` pairs in the database,
         or the keys matching ``pattern``, as 2-tuples."""
         return list(self.iteritems(pattern))
 
-    def itervalues(self, pattern="*"):
+    def itervalues(self, pattern="*", chunksize=None):
         """Iterate over all the values in the database, or those where the
         keys matches ``pattern``."""
-        for key, value in self.iteritems(pattern):
+        for key, value in self.iteritems(pattern, chunksize):
             yield value
 
     def values(self, pattern="*"):
@@ -176,11 +575,47 @@ class Client(object):
     def pop(self, name):
         """Get and remove key from database (atomic)."""
         name = mkey(name)
-        temp = mkey((name, "__poptmp__"))
-        self.rename(name, temp)
-        value = self[temp]
-        del(self[temp])
-        return value
+        if self.supports_getdel:
+            try:
+                value = self.api.execute_command("GETDEL", name)
+            except ResponseError, exc:
+                if "unknown command" not in str(exc).lower():
+                    raise
+                self.supports_getdel = False
+        if not self.supports_getdel:
+            value = POP_SCRIPT(self.api, keys=[name])[0]
+        self._invalidate(name)
+        if value is None:
+            raise KeyError(name)
+        return self.value_to_python(value)
+
+    def pop_many(self, names, default=None):
+        """Get and remove several keys from the database (atomic).
+
+        Returns a list with the values of the keys in the same order
+        as ``names``, where ``default`` is used for keys that did not
+        exist.
+
+        """
+        names = map(mkey, names)
+        if not names:
+            return []
+        values = POP_SCRIPT(self.api, keys=names)
+        map(self._invalidate, names)
+        decode = self.value_to_python
+        return [default if value is None else decode(value)
+                    for value in values]
+
+    def mget(self, names):
+        """Get the values of several keys at once.
+
+        Returns a list with the values in the same order as
+        ``names``, where nonexistent keys are ``None``.
+
+        """
+        decode = self.value_to_python
+        return [None if value is None else decode(value)
+                    for value in self.api.mget(map(mkey, names))]
 
     def get(self, key, default=None):
         """Returns the value at ``key`` if present, otherwise returns
@@ -193,19 +628,32 @@ class Client(object):
     def __getitem__(self, name):
         """``x.__getitem__(name) <==> x[name]``"""
         name = mkey(name)
+        if self.cache is not None:
+            try:
+                return self.cache.get(name)
+            except KeyError:
+                version = self.cache.version()
         value = self.api.get(name)
         if value is None:
             raise KeyError(name)
-        return self.value_to_python(value)
+        value = self.value_to_python(value)
+        if self.cache is not None:
+            self.cache.set(name, value, version=version)
+        return value
 
     def __setitem__(self, name, value):
         """``x.__setitem(name, value) <==> x[name] = value``"""
-        return self.api.set(mkey(name), self.prepare_value(value))
+        name = mkey(name)
+        result = self.api.set(name, self.prepare_value(value))
+        self._invalidate(name)
+        return result
 
     def __delitem__(self, name):
         """``x.__delitem__(name) <==> del(x[name])``"""
         name = mkey(name)
-        if not self.api.delete(name):
+        deleted = self.api.delete(name)
+        self._invalidate(name)
+        if not deleted:
             raise KeyError(name)
 
     def __len__(self):
@@ -221,3 +669,127 @@ class Client(object):
         return "<RedisClient: %s:%s/%s>" % (self.host,
                                            self.port,
                                            self.db or "")
+
+
+class Batch(Client):
+    """Batch of buffered write commands.
+
+    Supports the write operations of :class:`Client` (``__setitem__``,
+    ``__delitem__``, :meth:`update`, :meth:`rename`, :meth:`clear`)
+    and the datatypes created by it, but the commands are not sent until
+    the batch is flushed.  Operations reading values (``__getitem__``,
+    ``__contains__``, :meth:`pop`, :meth:`mget`, :meth:`keys`,
+    :meth:`iteritems`, ...) raise :exc:`TypeError`.
+
+    The datatype methods that only write can be used, e.g.
+    :meth:`~redish.types.List.append`, :meth:`~redish.types.List.extend`,
+    :meth:`~redish.types.Set.add`, :meth:`~redish.types.Set.update`,
+    :meth:`~redish.types.SortedSet.add`,
+    :meth:`~redish.types.SortedSet.update`, assigning to a
+    :class:`~redish.types.Dict`, :meth:`~redish.types.Queue.put_many`,
+    ``+=`` and ``-=`` on an :class:`~redish.types.Int`,
+    :meth:`~redish.types.HyperLogLog.update` and
+    :meth:`~redish.types.BitSet.set_many`, but their return values are
+    meaningless.  Methods that need a reply raise :exc:`TypeError`
+    (or return a placeholder, if the reply is returned as is).
+    Bloom filters and mirrored sorted sets can not be used in a batch.
+    The command of a datatype method raising :exc:`TypeError` may
+    already be buffered, but the batch is discarded if the exception
+    propagates out of the ``with`` block.
+
+    Use :meth:`Client.batch` to create a batch.
+
+    .. attribute:: results
+
+        List of replies for every command flushed so far, in the order
+        the commands were issued.  If a command failed, the exception
+        is present in its place.
+
+    """
+
+    def __init__(self, client, autoflush=None, raise_on_error=True):
+        self.host = client.host
+        self.port = client.port
+        self.db = client.db
+        self.serializer = client.serializer
+        self.cache = client.cache
+        if self.cache is not None:
+            self.cache = _BatchCache(self.cache)
+        self.client = client
+        self.autoflush = autoflush
+        self.raise_on_error = raise_on_error
+        self.results = []
+        self._pipe = client.api.pipeline()
+        self.api = _BatchPipeline(self, self._pipe)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.reset()
+        else:
+            self.flush()
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``
+
+        Returns the number of buffered commands.
+
+        """
+        return len(self._pipe.command_stack)
+
+    def _maybe_flush(self):
+        if self.autoflush and len(self) >= self.autoflush:
+            self.flush()
+
+    def flush(self):
+        """Send the buffered commands to the server.
+
+        Returns the list of replies for the commands flushed.
+
+        """
+        if not len(self):
+            return []
+        results = self._pipe.execute(raise_on_error=False)
+        if self.cache is not None:
+            self.cache.apply()
+        self.results.extend(results)
+        if self.raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def reset(self):
+        """Discard all buffered commands."""
+        self._pipe.reset()
+        if self.cache is not None:
+            self.cache.reset()
+
+    def _unsupported(self, *args, **kwargs):
+        raise TypeError("Values can not be read in batch mode.")
+    __getitem__ = __contains__ = get = pop = pop_many = mget = \
+        _unsupported
+    keys = iterkeys = items = iteritems = values = itervalues = \
+        _unsupported
+    id = BloomFilter = MirroredSortedSet = _unsupported
+
+    def __delitem__(self, name):
+        """``x.__delitem__(name) <==> del(x[name])``
+
+        Note that in batch mode nonexistent keys do not
+        raise :exc:`KeyError`.
+
+        """
+        name = mkey(name)
+        self.api.delete(name)
+        self._invalidate(name)
+
+    def batch(self, autoflush=None, raise_on_error=True):
+        return self
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<Batch: %s:%s/%s (%s pending)>" % (self.host, self.port,
+                                                    self.db or "", len(self))
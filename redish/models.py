@@ -1,4 +1,5 @@
 from redish.client import Client
+from redish.sharding import ShardedClient
 
 
 class ModelType(type):
@@ -163,7 +164,7 @@ class Manager(Client):
     def get_many(self, ids):
         """Get several entries at once."""
         return [self.instance(id, **fields)
-                    for id, fields in zip(ids, self.api.mget(ids))]
+                    for id, fields in zip(ids, self.mget(ids))]
 
     def __iter__(self):
         pattern = "%s:*" % self.model.name
@@ -179,3 +180,12 @@ class Manager(Client):
         entry = self.instance(**fields)
         entry.save()
         return entry
+
+
+class ShardedManager(Manager, ShardedClient):
+    """A manager storing its entries on several servers.
+
+    See :class:`Manager` and :class:`redish.sharding.ShardedClient`.
+
+    """
+    abstract = True
@@ -17,6 +17,7 @@ from codecs import encode, decode
 import re
 from redis import Redis
 from redish import types
+from redish.utils import chunks
 
 TYPE_MAP = {
     "list":   types.List,
@@ -102,7 +103,10 @@ class Proxy(Redis):
         """Copy the contents of the value into the redis store."""
         if key in self._empties:
             del self._empties[key]
-        if isinstance(value, (int, types.Int)):
+        if isinstance(value, types.Float):  # a subclass of types.Int
+            self.set(key, repr(float(value)))
+            return
+        elif isinstance(value, (int, types.Int)):
             self.set(key, int(value))
             return
         elif isinstance(value, basestring):
@@ -117,17 +121,23 @@ class Proxy(Redis):
         pline = self.pipeline()
         if self.exists(key):
             pline = pline.delete(key)
+        chunksize = types.Type.chunksize
         if isinstance(value, (list, types.List)):
-            for item in value:
-                pline = pline.rpush(key, item)
+            for chunk in chunks(value, chunksize):
+                pline = pline.execute_command("RPUSH", key, *chunk)
         elif isinstance(value, (set, types.Set)):
-            for item in value:
-                pline = pline.sadd(key, item)
+            for chunk in chunks(value, chunksize):
+                pline = pline.execute_command("SADD", key, *chunk)
         elif isinstance(value, (dict, types.Dict)):
             pline = pline.hmset(key, value)
         elif isinstance(value, (types.ZSet, types.SortedSet)):
-            for k,v in value.items():
-                pline = pline.zadd(key, k, v)
+            if isinstance(value, types.SortedSet):
+                items = value.items(withscores=True)
+            else:
+                items = value.items()
+            for chunk in chunks(items, chunksize):
+                pline = pline.execute_command("ZADD", key,
+                                    *[a for k, v in chunk for a in (v, k)])
         pline.execute()
     
     @keyspaced
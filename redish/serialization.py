@@ -42,6 +42,16 @@ class Serializer(object):
             value = value.decode(self.encoding)
         return self.deserialize(value)
 
+    def encode_many(self, values):
+        """Encode several values, returning a list."""
+        encode = self.encode
+        return [encode(value) for value in values]
+
+    def decode_many(self, values):
+        """Decode several values, returning a list."""
+        decode = self.decode
+        return [decode(value) for value in values]
+
     def serialize(self, value):
         raise NotImplementedError("Serializers must implement serialize()")
 
@@ -56,6 +66,18 @@ class Plain(Serializer):
 
     """
 
+    def encode_many(self, values):
+        """Encode several values, returning a list."""
+        if not self.encoding:
+            return list(values)
+        return super(Plain, self).encode_many(values)
+
+    def decode_many(self, values):
+        """Decode several values, returning a list."""
+        if not self.encoding:
+            return list(values)
+        return super(Plain, self).decode_many(values)
+
     def serialize(self, value):
         return value
 
@@ -0,0 +1,607 @@
+"""
+.. module:: sharding.py
+   :synopsis: Distribute keys over several Redis servers.
+
+A :class:`ShardedClient` has the same interface as
+:class:`redish.client.Client`, but every key is stored on one of several
+servers, chosen using consistent hashing::
+
+    >>> from redish.sharding import ShardedClient
+    >>> db = ShardedClient([{"host": "redis1"},
+    ...                     {"host": "redis2"},
+    ...                     {"host": "redis3"}])
+    >>> db["user:1001"] = {"name": "George"}
+
+Keys containing a hash tag (a non-empty substring inside ``{}``) are
+placed by the tag only, so keys sharing a tag are stored on the same
+server, e.g. ``"{user:1001}:name"`` and ``"{user:1001}:friends"``.
+
+"""
+import bisect
+import threading
+import time
+
+from hashlib import md5
+from itertools import izip
+from Queue import Queue, Full
+
+from redish import types
+from redish.client import Client
+from redish.utils import mkey, chunks
+
+
+def hash_tag(key):
+    """Return the part of ``key`` used for hashing.
+
+    This is the content of the first ``{...}`` section of the key if
+    present and not empty, otherwise the whole key.
+
+    """
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+class HashRing(object):
+    """Consistent hash ring.
+
+    :param nodes: List of nodes to distribute keys over.
+    :keyword replicas: Number of virtual nodes on the ring for every
+        node. Default is ``160``.
+
+    """
+    replicas = 160
+
+    def __init__(self, nodes, replicas=None):
+        self.replicas = replicas or self.replicas
+        self.nodes = list(nodes)
+        ring = {}
+        for index, node in enumerate(self.nodes):
+            for replica in xrange(self.replicas):
+                ring[self._hash("%s-%s" % (node, replica))] = index
+        self._hashes = sorted(ring)
+        self._index = [ring[h] for h in self._hashes]
+
+    def _hash(self, key):
+        return long(md5(key).hexdigest()[:16], 16)
+
+    def get_node_index(self, key):
+        """Return the index of the node ``key`` belongs to."""
+        i = bisect.bisect(self._hashes, self._hash(hash_tag(key)))
+        return self._index[i % len(self._hashes)]
+
+    def get_node(self, key):
+        """Return the node ``key`` belongs to."""
+        return self.nodes[self.get_node_index(key)]
+
+
+def _fanout(calls):
+    """Run several ``(fun, args)`` calls in parallel threads, and
+    return the list of their return values."""
+    if len(calls) == 1:
+        return [calls[0][0](*calls[0][1])]
+    results = [None] * len(calls)
+    errors = []
+
+    def run(i):
+        fun, args = calls[i]
+        try:
+            results[i] = fun(*args)
+        except Exception, exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(i, ))
+                    for i in xrange(len(calls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def _imerge(iterators, maxsize=1000, poll_interval=0.1):
+    """Consume several iterators in parallel threads, and yield
+    their items as they become available.
+
+    The threads stop when the merged iterator is exhausted,
+    closed (or garbage collected), or one of the iterators raises
+    an exception.
+
+    """
+    queue = Queue(maxsize)
+    done = object()
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=poll_interval)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce(it):
+        try:
+            for item in it:
+                if not put((None, item)):
+                    return
+        except Exception, exc:
+            put((exc, None))
+        else:
+            put((None, done))
+
+    for it in iterators:
+        thread = threading.Thread(target=produce, args=(it, ))
+        thread.setDaemon(True)
+        thread.start()
+
+    try:
+        remaining = len(iterators)
+        while remaining:
+            exc, item = queue.get()
+            if exc is not None:
+                raise exc
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        stopped.set()
+
+
+class _StripeRouter(object):
+    """Sends the commands of a :class:`redish.types.StripedCounter`
+    to the servers the stripes belong to."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def incr(self, name, amount=1):
+        return self.client.shard(name).api.incr(name, amount)
+
+    def mget(self, names):
+        return self.client._fanout_groups(names,
+                            lambda node, names: node.api.mget(names))
+
+    def delete(self, *names):
+        return sum(_fanout([(self.client.nodes[index].api.delete,
+                                [name for _, name in items])
+                                for index, items in
+                                    self.client._group(names).items()]))
+
+
+class ShardedClient(Client):
+    """Redis client distributing keys over several servers.
+
+    :param nodes: List of servers to use, either as
+        :class:`redish.client.Client` instances, or as dictionaries of
+        keyword arguments to :class:`redish.client.Client`.
+    :keyword replicas: Number of virtual nodes for every server in the
+        hash ring.  See :class:`HashRing`.
+    :keyword serializer: Serializer used by all of the servers.
+        The default is to use :class:`redish.serialization.Pickler`.
+    :keyword cache: Optional :class:`redish.cache.LocalCache` shared
+        by all of the servers.
+
+    Commands operating on several keys (:meth:`update`, :meth:`mget`,
+    :meth:`keys`, :meth:`iteritems`, ...) are sent to all the servers
+    involved in parallel.
+
+    **Note:** Renaming a key to a name belonging to another server
+    is not atomic.
+
+    Batches (see :meth:`batch`) keep a batch for every server,
+    so commands are only atomic per server.
+
+    """
+
+    def __init__(self, nodes, replicas=None, serializer=None, cache=None):
+        self.serializer = serializer or self.serializer
+        if cache is not None:
+            self.cache = cache
+        self.nodes = [self._client(node) for node in nodes]
+        self.ring = HashRing(["%s:%s/%s" % (node.host, node.port,
+                                            node.db or "")
+                                for node in self.nodes], replicas)
+
+    def _client(self, node):
+        if isinstance(node, Client):
+            return node
+        return Client(serializer=self.serializer, cache=self.cache, **node)
+
+    def shard(self, name):
+        """Return the :class:`redish.client.Client` for the server
+        key ``name`` belongs to."""
+        return self.nodes[self.ring.get_node_index(mkey(name))]
+
+    def _group(self, names):
+        groups = {}
+        for position, name in enumerate(names):
+            index = self.ring.get_node_index(name)
+            groups.setdefault(index, []).append((position, name))
+        return groups
+
+    def _fanout_groups(self, names, call, default=None):
+        """Call ``call(node, names)`` for the names belonging to every
+        server, in parallel, and return the list of values in the same
+        order as ``names``."""
+        values = [default] * len(names)
+        groups = self._group(names).items()
+        results = _fanout([(call, (self.nodes[index],
+                                   [name for _, name in items]))
+                                for index, items in groups])
+        for (_, items), result in izip(groups, results):
+            for (position, _), value in izip(items, result):
+                values[position] = value
+        return values
+
+    def _fanout_nodes(self, method, *args):
+        return _fanout([(getattr(node, method), args)
+                            for node in self.nodes])
+
+    def id(self, name):
+        """Return the next id for a name."""
+        return types.Id(name, self.shard("ids:%s" % (name, )).api)
+
+    def Int(self, name, buffered=False, staleness=None):
+        """The integer (counter) datatype.
+
+        See :meth:`redish.client.Client.Int`.
+
+        """
+        return self.shard(name).Int(name, buffered=buffered,
+                                    staleness=staleness)
+
+    def Float(self, name):
+        """The float (counter) datatype.
+
+        See :meth:`redish.client.Client.Float`.
+
+        """
+        return self.shard(name).Float(name)
+
+    def StripedCounter(self, name, stripes=None, staleness=None):
+        """A counter spread over several keys.
+
+        Every stripe is stored on the server it belongs to, so the
+        increments are spread over the servers (unless ``name``
+        contains a hash tag, see :func:`hash_tag`), and the total is
+        read from all of them in parallel.
+        See :meth:`redish.client.Client.StripedCounter`.
+
+        """
+        return types.StripedCounter(name, _StripeRouter(self),
+                                    stripes=stripes, staleness=staleness)
+
+    def List(self, name, initial=None, serializer=None):
+        """The list datatype.
+
+        See :meth:`redish.client.Client.List`.
+
+        """
+        return self.shard(name).List(name, initial=initial,
+                                     serializer=serializer)
+
+    def Set(self, name, initial=None, serializer=None):
+        """The set datatype.
+
+        See :meth:`redish.client.Client.Set`.
+
+        """
+        return self.shard(name).Set(name, initial, serializer=serializer)
+
+    def SortedSet(self, name, initial=None, serializer=None):
+        """The sorted set datatype.
+
+        See :meth:`redish.client.Client.SortedSet`.
+
+        """
+        return self.shard(name).SortedSet(name, initial,
+                                          serializer=serializer)
+
+    def HyperLogLog(self, name, initial=None, serializer=None):
+        """The HyperLogLog datatype.
+
+        See :meth:`redish.client.Client.HyperLogLog`.
+
+        """
+        return self.shard(name).HyperLogLog(name, initial,
+                                            serializer=serializer)
+
+    def BitSet(self, name, initial=None):
+        """The bitset datatype.
+
+        **Note:** Bitwise operations require all the keys
+        involved to be stored on the same server, see :func:`hash_tag`.
+
+        See :meth:`redish.client.Client.BitSet`.
+
+        """
+        return self.shard(name).BitSet(name, initial)
+
+    def BloomFilter(self, name, capacity=None, error_rate=None,
+            serializer=None):
+        """The Bloom filter datatype.
+
+        See :meth:`redish.client.Client.BloomFilter`.
+
+        """
+        return self.shard(name).BloomFilter(name, capacity=capacity,
+                                            error_rate=error_rate,
+                                            serializer=serializer)
+
+    def MirroredSortedSet(self, name, initial=None, serializer=None,
+            **kwargs):
+        """A sorted set with a local replica serving reads.
+
+        See :meth:`redish.client.Client.MirroredSortedSet`.
+
+        """
+        return self.shard(name).MirroredSortedSet(name, initial,
+                                                  serializer=serializer,
+                                                  **kwargs)
+
+    def Dict(self, name, initial=None, serializer=None, **extra):
+        """The dictionary datatype (Hash).
+
+        See :meth:`redish.client.Client.Dict`.
+
+        """
+        return self.shard(name).Dict(name, initial=initial,
+                                     serializer=serializer, **extra)
+
+    def Queue(self, name, initial=None, maxsize=None, serializer=None):
+        """The queue datatype.
+
+        See :meth:`redish.client.Client.Queue`.
+
+        """
+        return self.shard(name).Queue(name, initial=initial, maxsize=maxsize,
+                                      serializer=serializer)
+
+    def LifoQueue(self, name, initial=None, maxsize=None, serializer=None):
+        """The LIFO queue datatype.
+
+        See :meth:`redish.client.Client.LifoQueue`.
+
+        """
+        return self.shard(name).LifoQueue(name, initial=initial,
+                                          maxsize=maxsize,
+                                          serializer=serializer)
+
+    def PriorityQueue(self, name, initial=None, maxsize=None,
+            serializer=None):
+        """The priority queue datatype.
+
+        See :meth:`redish.client.Client.PriorityQueue`.
+
+        """
+        return self.shard(name).PriorityQueue(name, initial=initial,
+                                              maxsize=maxsize,
+                                              serializer=serializer)
+
+    def DelayedQueue(self, name, initial=None, serializer=None):
+        """The delayed queue datatype.
+
+        See :meth:`redish.client.Client.DelayedQueue`.
+
+        """
+        return self.shard(name).DelayedQueue(name, initial=initial,
+                                             serializer=serializer)
+
+    def ReliableQueue(self, name, initial=None, maxsize=None,
+            serializer=None, **kwargs):
+        """The reliable queue datatype.
+
+        See :meth:`redish.client.Client.ReliableQueue`.
+
+        """
+        return self.shard(name).ReliableQueue(name, initial=initial,
+                                              maxsize=maxsize,
+                                              serializer=serializer,
+                                              **kwargs)
+
+    def batch(self, autoflush=None, raise_on_error=True):
+        """Create a batch of write commands, routed to the servers
+        by key.
+
+        ``autoflush`` applies to the commands for every server.
+        See :class:`ShardedBatch`, and :meth:`redish.client.Client.batch`.
+
+        """
+        return ShardedBatch(self, autoflush=autoflush,
+                            raise_on_error=raise_on_error)
+
+    def clear(self):
+        """Remove all keys from the current database on all servers."""
+        return all(self._fanout_nodes("clear"))
+
+    def update(self, mapping, ttl=None, chunksize=None, callback=None):
+        """Update database with the key/values from a :class:`dict`,
+        or an iterable of ``(key, value)`` pairs.
+
+        The items are read one chunk at a time, and the keys of every
+        chunk are sent to their servers in parallel.  ``callback`` is
+        called after every chunk with the totals for all servers.
+        See :meth:`redish.client.Client.update`.
+
+        """
+        if hasattr(mapping, "iteritems"):
+            mapping = mapping.iteritems()
+        chunksize = chunksize or self.chunksize
+        stored = 0
+        time_start = time.time()
+        for chunk in chunks(mapping, chunksize):
+            groups = {}
+            for key, value in chunk:
+                groups.setdefault(self.ring.get_node_index(mkey(key)),
+                                  []).append((key, value))
+            stored += sum(_fanout([(self.nodes[index].update,
+                                        (items, ttl, chunksize))
+                                        for index, items in groups.items()]))
+            if callback is not None:
+                callback(stored, time.time() - time_start)
+        return stored
+
+    def mget(self, names):
+        """Get the values of several keys at once.
+
+        See :meth:`redish.client.Client.mget`.
+
+        """
+        return self._fanout_groups(map(mkey, names),
+                                   lambda node, names: node.mget(names))
+
+    def pop_many(self, names, default=None):
+        """Get and remove several keys from the database.
+
+        The keys are removed atomically on each server.
+        See :meth:`redish.client.Client.pop_many`.
+
+        """
+        return self._fanout_groups(map(mkey, names),
+                    lambda node, names: node.pop_many(names, default),
+                    default)
+
+    def rename(self, old_name, new_name):
+        """Rename key to a new name.
+
+        Keys moving to another server are copied using ``DUMP`` and
+        ``RESTORE`` (keeping the time to live), and then removed from
+        the old server.
+
+        """
+        old_name, new_name = mkey(old_name), mkey(new_name)
+        source, dest = self.shard(old_name), self.shard(new_name)
+        if source is dest:
+            return source.rename(old_name, new_name)
+        pipe = source.api.pipeline()
+        pipe.execute_command("DUMP", old_name)
+        pipe.execute_command("PTTL", old_name)
+        value, ttl = pipe.execute()
+        if value is None:
+            raise KeyError(old_name)
+        dest.api.execute_command("RESTORE", new_name, max(ttl, 0), value,
+                                 "REPLACE")
+        dest._invalidate(new_name)
+        source.api.delete(old_name)
+        source._invalidate(old_name)
+
+    def keys(self, pattern="*"):
+        """Get a list of all the keys in the database, or
+        matching ``pattern``."""
+        return sum(self._fanout_nodes("keys", pattern), [])
+
+    def iterkeys(self, pattern="*"):
+        """An iterator over all the keys in the database, or matching
+        ``pattern``."""
+        return _imerge([node.iterkeys(pattern) for node in self.nodes])
+
+    def iteritems(self, pattern="*", chunksize=None):
+        """An iterator over all the ``(key, value)`` items in the database,
+        or where the keys matches ``pattern``."""
+        return _imerge([node.iteritems(pattern, chunksize)
+                            for node in self.nodes])
+
+    def pop(self, name):
+        """Get and remove key from database (atomic)."""
+        return self.shard(name).pop(name)
+
+    def __getitem__(self, name):
+        """``x.__getitem__(name) <==> x[name]``"""
+        return self.shard(name)[name]
+
+    def __setitem__(self, name, value):
+        """``x.__setitem(name, value) <==> x[name] = value``"""
+        self.shard(name)[name] = value
+
+    def __delitem__(self, name):
+        """``x.__delitem__(name) <==> del(x[name])``"""
+        del(self.shard(name)[name])
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``"""
+        return sum(self._fanout_nodes("__len__"))
+
+    def __contains__(self, name):
+        """``x.__contains__(name) <==> name in x``"""
+        return name in self.shard(name)
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<ShardedClient: %s>" % (", ".join(self.ring.nodes), )
+
+
+class ShardedBatch(ShardedClient):
+    """Batch of buffered write commands for a :class:`ShardedClient`.
+
+    Keeps a :class:`redish.client.Batch` for every server, and routes
+    the commands by key, so the same write operations are supported.
+
+    Use :meth:`ShardedClient.batch` to create a batch.
+
+    """
+
+    def __init__(self, client, autoflush=None, raise_on_error=True):
+        self.serializer = client.serializer
+        self.cache = client.cache
+        self.client = client
+        self.ring = client.ring
+        self.nodes = [node.batch(autoflush=autoflush,
+                                 raise_on_error=raise_on_error)
+                        for node in client.nodes]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.reset()
+        else:
+            self.flush()
+
+    @property
+    def results(self):
+        """Replies for the commands flushed so far, grouped
+        by server."""
+        return sum([node.results for node in self.nodes], [])
+
+    def flush(self):
+        """Send the buffered commands to all servers, in parallel.
+
+        Returns the list of replies for the commands flushed,
+        grouped by server.
+
+        """
+        return sum(self._fanout_nodes("flush"), [])
+
+    def reset(self):
+        """Discard all buffered commands."""
+        for node in self.nodes:
+            node.reset()
+
+    def rename(self, old_name, new_name):
+        """Rename key to a new name.
+
+        Only keys stored on the same server can be renamed in a batch.
+
+        """
+        source, dest = self.shard(old_name), self.shard(new_name)
+        if source is not dest:
+            raise TypeError(
+                "Keys can not be renamed across servers in batch mode.")
+        return source.rename(old_name, new_name)
+
+    def batch(self, autoflush=None, raise_on_error=True):
+        return self
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<ShardedBatch: %s (%s pending)>" % (
+                ", ".join(self.ring.nodes), len(self))
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import unittest2 as unittest
+
+from redis.exceptions import ConnectionError
+
+from redish.cache import LocalCache
+
+
+class test_LocalCache(unittest.TestCase):
+
+    def test_get_set(self):
+        c = LocalCache()
+        with self.assertRaises(KeyError):
+            c.get("foo")
+        c.set("foo", {"name": "George"})
+        self.assertDictEqual(c.get("foo"), {"name": "George"})
+        self.assertEqual(c.hits, 1)
+        self.assertEqual(c.misses, 1)
+
+    def test_evicts_least_recently_used(self):
+        c = LocalCache(maxsize=2)
+        c.set("foo", 1)
+        c.set("bar", 2)
+        c.get("foo")
+        c.set("baz", 3)
+        self.assertEqual(c.get("foo"), 1)
+        with self.assertRaises(KeyError):
+            c.get("bar")
+        self.assertEqual(c.evictions, 1)
+        self.assertEqual(len(c), 2)
+
+    def test_expires(self):
+        c = LocalCache(ttl=0.01)
+        c.set("foo", 1)
+        time.sleep(0.02)
+        with self.assertRaises(KeyError):
+            c.get("foo")
+        self.assertEqual(len(c), 0)
+
+    def test_invalidate_fields(self):
+        c = LocalCache()
+        c.set("foo", 1, field="a")
+        c.set("foo", 2, field="b")
+        c.set("bar", 3)
+        c.invalidate("foo")
+        with self.assertRaises(KeyError):
+            c.get("foo", "a")
+        with self.assertRaises(KeyError):
+            c.get("foo", "b")
+        self.assertEqual(c.get("bar"), 3)
+
+    def test_version(self):
+        c = LocalCache(maxsize=2)
+        version = c.version()
+        c.invalidate("foo")
+        c.set("foo", 1, version=version)
+        c.set("bar", 2, version=version)
+        with self.assertRaises(KeyError):
+            c.get("foo")
+        self.assertEqual(c.get("bar"), 2)
+        version = c.version()
+        for key in ("a", "b", "c"):
+            c.invalidate(key)
+        c.set("a", 1, version=version)
+        with self.assertRaises(KeyError):
+            c.get("a")
+        version = c.version()
+        c.clear()
+        c.set("bar", 2, version=version)
+        with self.assertRaises(KeyError):
+            c.get("bar")
+
+
+class MockPubSub(object):
+
+    def __init__(self, api):
+        self.api = api
+
+    def psubscribe(self, pattern):
+        self.api.patterns.append(pattern)
+        if self.api.fail:
+            raise ConnectionError("connection refused")
+
+    def listen(self):
+        yield {"type": "psubscribe", "channel": None, "data": 1}
+        self.api.subscribed.set()
+        while not self.api.fail:
+            time.sleep(0.01)
+        raise ConnectionError("connection lost")
+
+    def close(self):
+        pass
+
+
+class MockAPI(object):
+
+    class connection_pool(object):
+        connection_kwargs = {"db": 3}
+
+    def __init__(self):
+        self.patterns = []
+        self.fail = False
+        self.subscribed = threading.Event()
+
+    def pubsub(self):
+        return MockPubSub(self)
+
+
+class test_listen(unittest.TestCase):
+
+    def test_reconnects(self):
+        c = LocalCache()
+        c.retry_interval = 0.01
+        api = MockAPI()
+        c.listen(api)
+        self.assertTrue(api.subscribed.wait(1))
+        self.assertEqual(api.patterns, ["__keyspace@3__:*"])
+        self.assertTrue(c.connected)
+        c.set("foo", 1)
+        self.assertEqual(c.get("foo"), 1)
+
+        api.subscribed.clear()
+        api.fail = True
+        time.sleep(0.1)
+        self.assertFalse(c.connected)
+        with self.assertRaises(KeyError):
+            c.get("foo")
+        c.set("foo", 1)
+        self.assertEqual(len(c), 0)
+        self.assertGreater(len(api.patterns), 2)
+
+        api.fail = False
+        self.assertTrue(api.subscribed.wait(1))
+        self.assertTrue(c.connected)
+        c.set("foo", 1)
+        self.assertEqual(c.get("foo"), 1)
+
+        # park the listener thread until the process exits.
+        c.retry_interval = 3600
+        api.fail = True
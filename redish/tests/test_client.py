@@ -154,3 +154,158 @@ class test_Client(ClientTestCase):
 
 
 
+
+    def test_batch(self):
+        with self.client.batch() as b:
+            b["test:batch:1"] = "foo"
+            b.update({"test:batch:2": "bar", "test:batch:3": "baz"})
+            b.List("test:batch:list").extend(["x", "y", "z"])
+            del(b["test:batch:3"])
+            self.assertNotIn("test:batch:1", self.client)
+        self.assertEqual(self.client["test:batch:1"], "foo")
+        self.assertEqual(self.client["test:batch:2"], "bar")
+        self.assertNotIn("test:batch:3", self.client)
+        self.assertListEqual(list(self.client.List("test:batch:list")),
+                             ["x", "y", "z"])
+        self.assertEqual(len(b), 0)
+        self.assertTrue(b.results)
+
+    def test_batch_autoflush(self):
+        with self.client.batch(autoflush=10) as b:
+            for i in range(25):
+                b["test:batch_autoflush:%s" % i] = i
+            self.assertEqual(len(b.results), 20)
+            self.assertEqual(len(b), 5)
+        self.assertEqual(len(b.results), 25)
+        self.assertEqual(self.client["test:batch_autoflush:24"], 24)
+
+    def test_batch_discarded_on_error(self):
+        with self.assertRaises(KeyError):
+            with self.client.batch() as b:
+                b["test:batch_discarded"] = "foo"
+                raise KeyError("foo")
+        self.assertNotIn("test:batch_discarded", self.client)
+
+    def test_batch_raises_command_error(self):
+        self.client.List("test:batch_error:list", ["foo"])
+        with self.assertRaises(client.ResponseError):
+            with self.client.batch() as b:
+                b.api.incr("test:batch_error:list")
+                b["test:batch_error:ok"] = "bar"
+        self.assertIsInstance(b.results[0], client.ResponseError)
+        self.assertEqual(self.client["test:batch_error:ok"], "bar")
+
+    def test_batch_reads_unsupported(self):
+        self.client["test:batch_reads:foo"] = "foo"
+        with self.client.batch() as b:
+            for read in (lambda: b["test:batch_reads:foo"],
+                         lambda: "test:batch_reads:foo" in b,
+                         lambda: b.pop("test:batch_reads:foo"),
+                         lambda: b.pop_many(["test:batch_reads:foo"]),
+                         lambda: b.mget(["test:batch_reads:foo"]),
+                         lambda: b.keys(),
+                         lambda: list(b.iteritems()),
+                         lambda: b.BloomFilter("test:batch_reads:bloom"),
+                         lambda: b.Set("test:batch_reads:set").pop()):
+                with self.assertRaises(TypeError):
+                    read()
+            i = b.Int("test:batch_reads:int")
+            with self.assertRaises(TypeError):
+                i *= 2
+            b.reset()
+        self.assertEqual(self.client["test:batch_reads:foo"], "foo")
+
+    def test_iteritems_chunked(self):
+        keys = dict(("test:iteritems_chunked:%s" % i, i)
+                        for i in range(250))
+        self.client.update(keys)
+        self.client.List("test:iteritems_chunked:list", ["foo"])
+        it = self.client.iteritems("test:iteritems_chunked:*", chunksize=10)
+        self.assertDictEqual(dict(it), keys)
+        self.client.clear()
+
+    def test_pop_many(self):
+        keys = {"test:pop_many:1": 1,
+                "test:pop_many:2": 2,
+                "test:pop_many:3": 3}
+        self.client.update(keys)
+        values = self.client.pop_many(["test:pop_many:1",
+                                       "test:pop_many:nonexistent",
+                                       "test:pop_many:3"], default=-1)
+        self.assertListEqual(values, [1, -1, 3])
+        self.assertNotIn("test:pop_many:1", self.client)
+        self.assertIn("test:pop_many:2", self.client)
+        self.assertNotIn("test:pop_many:3", self.client)
+
+    def test_pop_without_getdel(self):
+        self.client.supports_getdel = False
+        self.client["test:pop_without_getdel"] = "foo"
+        self.assertEqual(self.client.pop("test:pop_without_getdel"), "foo")
+        with self.assertRaises(KeyError):
+            self.client.pop("test:pop_without_getdel")
+
+    def test_update_generator(self):
+        progress = []
+
+        def callback(stored, elapsed):
+            progress.append(stored)
+
+        items = (("test:update_generator:%s" % i, i) for i in range(250))
+        self.assertEqual(self.client.update(items, chunksize=100,
+                                            callback=callback), 250)
+        self.assertListEqual(progress, [100, 200, 250])
+        self.assertEqual(self.client["test:update_generator:249"], 249)
+
+    def test_update_ttl(self):
+        self.client.update({"test:update_ttl": 1}, ttl=60)
+        self.assertEqual(self.client["test:update_ttl"], 1)
+        self.assertTrue(0 < self.client.api.ttl("test:update_ttl") <= 60)
+
+    def test_cache(self):
+        from redish.cache import LocalCache
+        c = self.get_client()
+        c.cache = LocalCache()
+        c["test:cache"] = "foo"
+        self.assertEqual(c["test:cache"], "foo")
+        self.assertEqual(c["test:cache"], "foo")
+        self.assertEqual(c.cache.hits, 1)
+        c["test:cache"] = "bar"
+        self.assertEqual(c["test:cache"], "bar")
+        del(c["test:cache"])
+        with self.assertRaises(KeyError):
+            c["test:cache"]
+
+    def test_cache_read_during_write(self):
+        from redish.cache import LocalCache
+        c = self.get_client()
+        c.cache = LocalCache()
+        c["test:cache"] = "foo"
+        set = c.api.set
+
+        def racing_set(name, value):
+            # another reader caches the value before the write lands.
+            self.assertEqual(c[name], "foo")
+            return set(name, value)
+        c.api.set = racing_set
+        c["test:cache"] = "bar"
+        self.assertEqual(c["test:cache"], "bar")
+
+    def test_cache_batch(self):
+        from redish.cache import LocalCache
+        c = self.get_client()
+        c.cache = LocalCache()
+        c["test:cache"] = "foo"
+        c.update({"test:cache2": "foo"})
+        self.assertEqual(c["test:cache"], "foo")
+        self.assertEqual(c["test:cache2"], "foo")
+        with c.batch() as b:
+            b["test:cache"] = "bar"
+            b.update({"test:cache2": "bar"})
+            self.assertEqual(c["test:cache"], "foo")
+            self.assertEqual(c["test:cache2"], "foo")
+        self.assertEqual(c["test:cache"], "bar")
+        self.assertEqual(c["test:cache2"], "bar")
+        with c.batch() as b:
+            b.Dict("test:cache:dict")["x"] = 1
+            b.clear()
+        self.assertEqual(len(c.cache), 0)
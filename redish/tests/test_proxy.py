@@ -0,0 +1,34 @@
+from __future__ import with_statement
+
+import unittest2 as unittest
+
+from redish import types
+from redish.proxy import Proxy
+from redish.tests import config
+
+
+class test_Proxy(unittest.TestCase):
+
+    def setUp(self):
+        self.proxy = Proxy(**config.connection)
+        self.proxy.flushdb()
+
+    def tearDown(self):
+        self.proxy.flushdb()
+
+    def test_set_ZSet(self):
+        self.proxy["test:zset"] = types.ZSet({"a": 1, "b": 2.5})
+        self.assertListEqual(self.proxy.zrange("test:zset", 0, -1,
+                                               withscores=True),
+                             [("a", 1.0), ("b", 2.5)])
+
+    def test_set_SortedSet(self):
+        self.proxy["test:zset"] = types.ZSet({"a": 1, "b": 2.5, "c": 3})
+        self.proxy["test:zset2"] = self.proxy["test:zset"]
+        self.assertListEqual(self.proxy.zrange("test:zset2", 0, -1,
+                                               withscores=True),
+                             [("a", 1.0), ("b", 2.5), ("c", 3.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
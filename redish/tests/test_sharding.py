@@ -0,0 +1,150 @@
+from __future__ import with_statement
+
+import itertools
+import threading
+import time
+
+import unittest2 as unittest
+
+from redish import sharding
+from redish.client import Client
+from redish.tests import config
+from redish.tests.test_client import ClientTestCase
+
+
+class test_hash_tag(unittest.TestCase):
+
+    def test_no_tag(self):
+        self.assertEqual(sharding.hash_tag("user:1001"), "user:1001")
+
+    def test_tag(self):
+        self.assertEqual(sharding.hash_tag("{user:1001}:name"), "user:1001")
+
+    def test_empty_tag(self):
+        self.assertEqual(sharding.hash_tag("{}:name"), "{}:name")
+
+
+class test_HashRing(unittest.TestCase):
+
+    def test_get_node(self):
+        ring = sharding.HashRing(["a", "b", "c"])
+        nodes = set(ring.get_node("key:%s" % i) for i in range(1000))
+        self.assertSetEqual(nodes, set(["a", "b", "c"]))
+
+    def test_hash_tags_on_same_node(self):
+        ring = sharding.HashRing(["a", "b", "c"])
+        for i in range(100):
+            self.assertEqual(ring.get_node("{user:%s}:name" % i),
+                             ring.get_node("{user:%s}:friends" % i))
+
+    def test_consistent(self):
+        keys = ["key:%s" % i for i in range(1000)]
+        ring1 = sharding.HashRing(["a", "b", "c"])
+        ring2 = sharding.HashRing(["a", "b", "c", "d"])
+        moved = [key for key in keys
+                    if ring1.get_node(key) != ring2.get_node(key)]
+        self.assertTrue(all(ring2.get_node(key) == "d" for key in moved))
+        self.assertLess(len(moved), len(keys) / 2)
+
+
+class test_fanout(unittest.TestCase):
+
+    def test_fanout(self):
+        self.assertListEqual(sharding._fanout([(sum, ([1, 2], )),
+                                               (sum, ([3, 4], ))]), [3, 7])
+
+    def test_imerge(self):
+        merged = sharding._imerge([iter(range(10)), iter(range(10, 20))])
+        self.assertItemsEqual(list(merged), range(20))
+
+    def test_imerge_closed(self):
+        before = threading.active_count()
+        merged = sharding._imerge([itertools.count(), itertools.count()],
+                                  maxsize=10)
+        self.assertEqual(len([merged.next() for _ in range(5)]), 5)
+        merged.close()
+        time.sleep(0.5)
+        self.assertEqual(threading.active_count(), before)
+
+    def test_imerge_error(self):
+
+        def fail():
+            yield 1
+            raise KeyError("foo")
+
+        before = threading.active_count()
+        with self.assertRaises(KeyError):
+            list(sharding._imerge([fail(), itertools.count()], maxsize=10))
+        time.sleep(0.5)
+        self.assertEqual(threading.active_count(), before)
+
+
+class test_ShardedBatch(ClientTestCase):
+
+    def setUp(self):
+        super(test_ShardedBatch, self).setUp()
+        db = config.connection["db"]
+        if not str(db).isdigit():
+            self.skipTest("requires a numeric REDIS_TEST_DB")
+        self.other = Client(**dict(config.connection, db=int(db) + 1))
+        self.other.clear()
+        self.sharded = sharding.ShardedClient([self.client, self.other])
+
+    def tearDown(self):
+        super(test_ShardedBatch, self).tearDown()
+        self.other.clear()
+
+    def test_batch(self):
+        keys = dict(("test:sharded_batch:%s" % i, i) for i in range(50))
+        with self.sharded.batch() as b:
+            b.update(keys)
+            b["test:sharded_batch:extra"] = "foo"
+            b.List("test:sharded_batch:list").extend(["x", "y"])
+            self.assertTrue(len(b))
+            self.assertEqual(len(self.sharded), 0)
+            with self.assertRaises(TypeError):
+                b["test:sharded_batch:extra"]
+        self.assertEqual(len(b), 0)
+        self.assertTrue(len(self.client) and len(self.other))
+        self.assertEqual(len(self.sharded), 52)
+        self.assertListEqual(self.sharded.mget(sorted(keys)),
+                             [keys[key] for key in sorted(keys)])
+        self.assertListEqual(list(self.sharded.List(
+                                "test:sharded_batch:list")), ["x", "y"])
+
+    def test_StripedCounter(self):
+        c = self.sharded.StripedCounter("test:sharded_striped", stripes=8)
+        for stripe, key in enumerate(c.keys):
+            self.sharded.shard(key).api.incr(key, stripe)
+        c.incr(100)
+        self.assertEqual(c.total(), sum(range(8)) + 100)
+        self.assertTrue(len(self.client) and len(self.other))
+        self.assertEqual(c.clear(), 8)
+        self.assertEqual(c.total(), 0)
+
+    def test_rename_across_servers(self):
+        old = "test:sharded_rename:list"
+        new = [name for name in ("test:sharded_rename:%s" % i
+                                    for i in range(100))
+                    if self.sharded.shard(name) is not
+                        self.sharded.shard(old)][0]
+        self.sharded.List(old).extend(["x", "y"])
+        self.sharded.shard(old).api.expire(old, 60)
+        self.sharded.rename(old, new)
+        self.assertNotIn(old, self.sharded)
+        self.assertListEqual(list(self.sharded.List(new)), ["x", "y"])
+        self.assertTrue(0 < self.sharded.shard(new).api.ttl(new) <= 60)
+        with self.assertRaises(KeyError):
+            self.sharded.rename(old, new)
+        with self.assertRaises(TypeError):
+            with self.sharded.batch() as b:
+                b.rename(new, old)
+
+    def test_update_callback(self):
+        progress = []
+        items = (("test:sharded_update:%s" % i, i) for i in range(250))
+        self.assertEqual(self.sharded.update(items, chunksize=100,
+                            callback=lambda stored, _: progress.append(
+                                stored)), 250)
+        self.assertListEqual(progress, [100, 200, 250])
+        self.assertEqual(len(self.sharded), 250)
@@ -1,6 +1,15 @@
+from __future__ import division
 from __future__ import with_statement
 
+import random
+import threading
+import time
+import unittest2 as unittest
+
+from datetime import datetime
+
 from redish import types
+from redish.serialization import Plain
 from redish.client import ResponseError
 from redish.tests.test_client import ClientTestCase
 
@@ -48,13 +57,29 @@ class test_List(ClientTestCase):
 
     def test__repr__(self):
         l = self.client.List("test:List:__repr__", [1, 2, 3])
-        self.assertIn("'1', '2', '3'", repr(l))
+        self.assertIn("1, 2, 3", repr(l))
+
+    def test_serializer(self):
+        data = [{"name": "George"}, ["Jerry", "Elaine"], 3.14, None]
+        l = self.client.List("test:List:serializer", data)
+        self.assertListEqual(list(l), data)
+        self.assertListEqual(l[1:3], data[1:3])
+        self.assertIsNone(l.pop())
+        self.assertEqual(l.popleft(), data[0])
+        raw = self.client.List("test:List:serializer", serializer=Plain())
+        self.assertIsInstance(raw[0], str)
 
     def test__iter__(self):
         data = ["foo", "bar", "baz"]
         l = self.client.List("test:List:__iter__", data)
         self.assertListEqual(list(iter(l)), data)
 
+    def test__iter__paged(self):
+        data = map(str, range(250))
+        l = self.client.List("test:List:__iter__paged", data)
+        l.page_size = 100
+        self.assertListEqual(list(iter(l)), data)
+
     def test__getslice__(self):
         data = ["foo", "bar", "baz", "xuzzy"]
         l = self.client.List("test:List:__getslice__", data)
@@ -114,6 +139,14 @@ class test_List(ClientTestCase):
         l.extendleft(data2)
         self.assertListEqual(list(l), list(reversed(data2)) + data1)
 
+    def test_extend_chunked(self):
+        l = self.client.List("test:List:extend_chunked")
+        l.extend((str(i) for i in xrange(2500)), chunksize=100)
+        self.assertListEqual(list(l), map(str, range(2500)))
+        l.extendleft((str(i) for i in xrange(250)), chunksize=100)
+        self.assertEqual(len(l), 2750)
+        self.assertEqual(l[0], "249")
+
 
 class test_Set(ClientTestCase):
 
@@ -126,6 +159,12 @@ class test_Set(ClientTestCase):
         s = self.client.Set("test:Set:__iter__", data)
         self.assertItemsEqual(list(iter(s)), list(set(data)))
 
+    def test__iter__paged(self):
+        data = map(str, range(2500))
+        s = self.client.Set("test:Set:__iter__paged", data)
+        s.page_size = 100
+        self.assertSetEqual(set(iter(s)), set(data))
+
     def test__repr__(self):
         data = ["foo", "bar", "baz"]
         s = self.client.Set("test:Set:__repr__", data)
@@ -192,6 +231,12 @@ class test_Set(ClientTestCase):
         s1.update(ds2)
         self.assertSetEqual(s1._as_set(), ds1.union(ds2))
 
+    def test_update_chunked(self):
+        s = self.client.Set("test:Set:update_chunked", ["0"])
+        self.assertEqual(s.update((str(i) for i in xrange(2500)),
+                                  chunksize=100), 2499)
+        self.assertEqual(len(s), 2500)
+
     def test_intersection(self):
         ds1 = set(["foo", "bar", "baz"])
         ds2 = set(["baz", "xuzzy", "zaz"])
@@ -223,6 +268,97 @@ class test_Set(ClientTestCase):
         self.assertSetEqual(s1._as_set(), ds1.difference(ds2))
 
 
+class test_HyperLogLog(ClientTestCase):
+
+    def test_add_update(self):
+        h = self.client.HyperLogLog("test:HyperLogLog:add_update",
+                                    ["foo", "bar"])
+        self.assertEqual(len(h), 2)
+        self.assertTrue(h.add("baz"))
+        self.assertFalse(h.add("foo"))
+        self.assertTrue(h.update(xrange(10000), chunksize=300))
+        self.assertFalse(h.update(["foo", "bar"]))
+        self.assertAlmostEqual(len(h), 10003, delta=10003 * 0.03)
+
+    def test_count_merge(self):
+        h1 = self.client.HyperLogLog("test:HyperLogLog:merge1", range(10))
+        h2 = self.client.HyperLogLog("test:HyperLogLog:merge2",
+                                     range(5, 15))
+        self.assertEqual(h1.count(h2), 15)
+        self.assertEqual(len(h1), 10)
+        h1.merge(h2)
+        self.assertEqual(len(h1), 15)
+
+
+class test_BitSet(ClientTestCase):
+
+    def test_get_set(self):
+        b = self.client.BitSet("test:BitSet:get_set", [1, 5])
+        self.assertTrue(b[1])
+        self.assertFalse(b[2])
+        self.assertIn(5, b)
+        b[2] = True
+        self.assertFalse(b.add(3))
+        self.assertTrue(b.discard(5))
+        self.assertListEqual(list(b), [1, 2, 3])
+        self.assertEqual(len(b), 3)
+
+    def test_set_get_many(self):
+        b = self.client.BitSet("test:BitSet:set_get_many")
+        b.page_size = 3
+        offsets = range(0, 10000, 7)
+        self.assertFalse(any(b.set_many(offsets, chunksize=100)))
+        self.assertListEqual(b.set_many([0, 1]), [True, False])
+        self.assertListEqual(b.get_many([0, 1, 2, 7]),
+                             [True, True, False, True])
+        self.assertEqual(b.count(), len(offsets) + 1)
+        self.assertEqual(b.count(0, 0), 3)
+        self.assertListEqual(list(b), sorted(offsets + [1]))
+        b.set_many([0, 1], False)
+        self.assertListEqual(b.get_many([0, 1]), [False, False])
+
+    def test_bitop(self):
+        b1 = self.client.BitSet("test:BitSet:bitop1", [1, 2, 3])
+        b2 = self.client.BitSet("test:BitSet:bitop2", [3, 4])
+        self.assertListEqual(
+            list(b1.intersection("test:BitSet:bitop3", b2)), [3])
+        self.assertListEqual(
+            list(b1.union("test:BitSet:bitop3", b2)), [1, 2, 3, 4])
+        b1 ^= b2
+        self.assertListEqual(list(b1), [1, 2, 4])
+        self.assertIsInstance(b1, types.BitSet)
+
+
+class test_BloomFilter(ClientTestCase):
+
+    def test_sizing(self):
+        f = self.client.BloomFilter("test:BloomFilter:sizing",
+                                    capacity=1000, error_rate=0.01)
+        self.assertEqual(f.size, 9586)
+        self.assertEqual(f.hashes, 7)
+        with self.assertRaises(ValueError):
+            self.client.BloomFilter("test:BloomFilter:sizing",
+                                    capacity=10 ** 10)
+
+    def test_add_contains(self):
+        f = self.client.BloomFilter("test:BloomFilter:add_contains",
+                                    capacity=1000, error_rate=0.01)
+        self.assertTrue(f.add("http://example.com/"))
+        self.assertFalse(f.add("http://example.com/"))
+        self.assertIn("http://example.com/", f)
+        self.assertNotIn("http://example.com/other", f)
+
+    def test_add_contains_many(self):
+        f = self.client.BloomFilter("test:BloomFilter:many",
+                                    capacity=1000, error_rate=0.01)
+        urls = ["http://example.com/%s" % i for i in xrange(1000)]
+        self.assertGreater(sum(f.add_many(urls, chunksize=100)), 950)
+        self.assertTrue(all(f.contains_many(urls)))
+        others = ["http://example.org/%s" % i for i in xrange(1000)]
+        self.assertLess(sum(f.contains_many(others)), 50)
+        self.assertAlmostEqual(len(f), 1000, delta=50)
+
+
 class test_SortedSet(ClientTestCase):
 
     def test_no_initial_data(self):
@@ -234,6 +370,12 @@ class test_SortedSet(ClientTestCase):
         z = self.client.SortedSet("test:SortedSet:__iter__", data)
         self.assertListEqual(list(iter(z)), ["bar", "baz", "foo"])
 
+    def test__iter__paged(self):
+        data = [(str(i), i) for i in range(250)]
+        z = self.client.SortedSet("test:SortedSet:__iter__paged", data)
+        z.page_size = 100
+        self.assertListEqual(list(iter(z)), map(str, range(250)))
+
     def test__getslice__(self):
         data = (("foo", 0.9), ("bar", 0.1), ("baz", 0.3))
         z = self.client.SortedSet("test:SortedSet:__getslice__", data)
@@ -303,12 +445,70 @@ class test_SortedSet(ClientTestCase):
         z.update(data2)
         self.assertListEqual(list(z), ["xuzzy", "baz", "zaz", "foo", "bar"])
 
+    def test_serializer(self):
+        data = ((("foo", 1), 0.9), (("bar", 2), 0.1), (("baz", 3), 0.3))
+        z = self.client.SortedSet("test:SortedSet:serializer", data)
+        self.assertListEqual(list(z), [("bar", 2), ("baz", 3), ("foo", 1)])
+        self.assertEqual(z.rank(("baz", 3)), 1)
+        self.assertEqual(z.score(("foo", 1)), 0.9)
+        self.assertTupleEqual(tuple(z.itemsview())[0], (("bar", 2), 0.1))
+
+    def test_update_chunked(self):
+        z = self.client.SortedSet("test:SortedSet:update_chunked")
+        data = ((str(i), i) for i in xrange(2500))
+        self.assertEqual(z.update(data, chunksize=100), 2500)
+        self.assertEqual(len(z), 2500)
+        self.assertListEqual(z[0:3], ["0", "1", "2"])
+
+    def test_update_flags(self):
+        data = (("foo", 0.9), ("bar", 0.1), ("baz", 0.3))
+        z = self.client.SortedSet("test:SortedSet:update_flags", data)
+        self.assertEqual(z.update([("foo", 0.1), ("xuzzy", 1)], xx=True), 0)
+        self.assertEqual(z.score("foo"), 0.1)
+        self.assertNotIn("xuzzy", list(z))
+        z.update([("foo", 0.0), ("bar", 0.5)], gt=True)
+        self.assertEqual(z.score("foo"), 0.1)
+        self.assertEqual(z.score("bar"), 0.5)
+        self.assertEqual(z.update([("bar", 2.0), ("xuzzy", 1)], nx=True), 1)
+        self.assertEqual(z.score("bar"), 0.5)
+
     def test_range_by_score(self):
         data = (("foo", 0.9), ("bar", 0.1), ("baz", 0.3),
                  ("bam", 1.2), ("xuzzy", 0.2), ("zaz", 0.4))
         z = self.client.SortedSet("test:SortedSet:range_by_score", data)
         self.assertListEqual(z.range_by_score(0.3, 1.0), [
                                 "baz", "zaz", "foo"])
+        self.assertListEqual(z.range_by_score(0.3, 1.0, num=2, start=1), [
+                                "zaz", "foo"])
+
+    def test_iter_range_by_score(self):
+        data = [("m%03d" % i, i // 7) for i in range(300)]
+        z = self.client.SortedSet("test:SortedSet:iter_range_by_score",
+                                  data)
+        self.assertListEqual(list(z.iter_range_by_score(2, 30, page_size=5)),
+                             [m for m, score in data if 2 <= score <= 30])
+        self.assertListEqual(
+            list(z.iter_range_by_score("-inf", "(3", page_size=3,
+                                       withscores=True)),
+            [(m, float(score)) for m, score in data if score < 3])
+        self.assertListEqual(
+            list(z.iter_revrange_by_score(40, 35, page_size=4)),
+            [m for m, score in reversed(data) if 35 <= score <= 40])
+
+    def test_iter_range_by_lex(self):
+        members = ["%s%s" % (a, b) for a in "abc" for b in "xyz"]
+        z = self.client.SortedSet("test:SortedSet:iter_range_by_lex",
+                                  [(m, 0) for m in members],
+                                  serializer=Plain())
+        self.assertListEqual(z.range_by_lex("[b", "+"), members[3:])
+        self.assertListEqual(z.range_by_lex("-", "+", num=2, start=1),
+                             members[1:3])
+        self.assertListEqual(list(z.iter_range_by_lex("(ay", "[cx",
+                                                      page_size=2)),
+                             members[2:7])
+        self.assertListEqual(list(z.iter_revrange_by_lex("+", "-",
+                                                         page_size=4)),
+                             list(reversed(members)))
 
     def test_itemsview(self):
         data = (("foo", 0.9), ("bar", 0.1), ("baz", 0.3),
@@ -339,6 +539,107 @@ class test_SortedSet(ClientTestCase):
         self.assertRaises(IndexError, z.keysview().__getitem__, 100)
 
 
+class test_MirroredSortedSet(ClientTestCase):
+
+    def wait_for(self, predicate, timeout=2.0):
+        deadline = time.time() + timeout
+        while not predicate() and time.time() < deadline:
+            time.sleep(0.01)
+        return predicate()
+
+    def test_reads(self):
+        z = self.client.MirroredSortedSet("test:MirroredSortedSet:reads",
+                                          [("foo", 3), ("bar", 1),
+                                           ("baz", 2)])
+        try:
+            self.assertListEqual(list(z), ["bar", "baz", "foo"])
+            self.assertListEqual(z[0:2], ["bar", "baz"])
+            self.assertListEqual(z.items(withscores=True),
+                                 [("bar", 1.0), ("baz", 2.0), ("foo", 3.0)])
+            self.assertListEqual(z.items(0, 1, desc=True), ["foo", "baz"])
+            self.assertListEqual(z.revrange(), ["foo", "baz", "bar"])
+            self.assertEqual(z.rank("baz"), 1)
+            self.assertEqual(z.revrank("baz"), 1)
+            self.assertIsNone(z.rank("missing"))
+            self.assertEqual(z.score("foo"), 3.0)
+            self.assertListEqual(z.range_by_score(2, 3), ["baz", "foo"])
+            self.assertListEqual(z.range_by_score("(1", "(3"), ["baz"])
+            self.assertListEqual(z.range_by_score("-inf", "+inf", num=2,
+                                                  start=1,
+                                                  withscores=True),
+                                 [("baz", 2.0), ("foo", 3.0)])
+            self.assertListEqual(z.range_by_score("(1", 3),
+                                 self.client.SortedSet(z.name)
+                                    .range_by_score("(1", 3))
+            self.assertIsNone(z.score("missing"))
+            self.assertEqual(len(z), 3)
+        finally:
+            z.close()
+
+    def test_write_through(self):
+        name = "test:MirroredSortedSet:write_through"
+        z1 = self.client.MirroredSortedSet(name)
+        z2 = self.client.MirroredSortedSet(name)
+        try:
+            z1.add("foo", 1)
+            self.assertEqual(z1.score("foo"), 1.0)
+            self.assertEqual(self.client.SortedSet(name).score("foo"), 1.0)
+            self.assertEqual(z1.increment("foo", 2), 3.0)
+            z1.add("bar", 2)
+            self.assertTrue(self.wait_for(lambda: len(z2.local) == 2))
+            self.assertEqual(z2.score("foo"), 3.0)
+            z2.remove("bar")
+            with self.assertRaises(KeyError):
+                z2.remove("bar")
+            self.assertTrue(self.wait_for(lambda: "bar" not in z1))
+            z2.update([("x", 10), ("y", 11)])
+            self.assertTrue(self.wait_for(lambda: len(z1.local) == 3))
+        finally:
+            z1.close()
+            z2.close()
+
+    def test_resync(self):
+        name = "test:MirroredSortedSet:resync"
+        z = self.client.MirroredSortedSet(name, listen=False,
+                                          resync_interval=0.05)
+        self.client.api.zadd(name, "foo", 1)
+        self.assertEqual(len(z), 0)
+        time.sleep(0.1)
+        self.assertEqual(len(z), 1)
+
+    def test_resync_in_listener(self):
+        name = "test:MirroredSortedSet:resync_in_listener"
+        z = self.client.MirroredSortedSet(name, resync_interval=0.05)
+        try:
+            synced_at = z._synced_at
+            self.client.api.zadd(name, "foo", 1)
+            self.assertTrue(self.wait_for(lambda: len(z.local) == 1))
+            self.assertGreater(z._synced_at, synced_at)
+        finally:
+            z.close()
+
+    def test_changes_during_resync(self):
+        name = "test:MirroredSortedSet:changes_during_resync"
+        z1 = self.client.MirroredSortedSet(name)
+        z2 = self.client.MirroredSortedSet(name)
+        api = z1.client
+        zrange = api.zrange
+
+        def racing_zrange(*args, **kwargs):
+            snapshot = zrange(*args, **kwargs)
+            z2.add("foo", 1)
+            self.wait_for(lambda: len(z1._changes))
+            return snapshot
+        api.zrange = racing_zrange
+        try:
+            z1.resync()
+        finally:
+            del(api.zrange)
+            z1.close()
+            z2.close()
+        self.assertEqual(z1.score("foo"), 1.0)
+
+
 class test_Dict(ClientTestCase):
 
     def test__init__(self):
@@ -389,10 +690,24 @@ class test_Dict(ClientTestCase):
         d = self.client.Dict("test:Dict:__iter__", items)
         self.assertListEqual(list(iter(d)), items.items())
 
+    def test__iter__paged(self):
+        items = dict((i, i) for i in map(str, range(2500)))
+        d = self.client.Dict("test:Dict:__iter__paged", items)
+        d.page_size = 100
+        self.assertDictEqual(dict(d.iteritems()), items)
+
     def test__repr__(self):
         d = self.client.Dict("test:Dict:__repr__", foo="bar")
         self.assertIn("'foo': 'bar'", repr(d))
 
+    def test_serializer(self):
+        data = {"name": {"first": "George"}, "age": 38}
+        d = self.client.Dict("test:Dict:serializer", data)
+        self.assertDictEqual(dict(d.items()), data)
+        self.assertDictEqual(dict(d.iteritems()), data)
+        self.assertDictEqual(d["name"], data["name"])
+        self.assertItemsEqual(d.values(), data.values())
+
     def test_iterkeys(self):
         # also tests d.keys()
         items = dict((i, i) for i in map(str, range(100)))
@@ -450,6 +765,233 @@ class test_Dict(ClientTestCase):
         d.update(data1)
         self.assertDictContainsSubset(data1, dict(d))
 
+    def test_cache(self):
+        from redish.cache import LocalCache
+        d = types.Dict("test:Dict:cache", self.client.api,
+                       cache=LocalCache(), foo="bar")
+        self.assertEqual(d["foo"], "bar")
+        self.assertEqual(d["foo"], "bar")
+        self.assertEqual(d.cache.hits, 1)
+        d["foo"] = "baz"
+        self.assertEqual(d["foo"], "baz")
+
+
+
+class test_Int(ClientTestCase):
+
+    def test_inplace_operators(self):
+        i = self.client.Int("test:Int:inplace_operators")
+        self.client.api.set(i.name, 7)
+        i *= 6
+        self.assertEqual(int(i), 42)
+        i //= -5
+        self.assertEqual(int(i), -9)
+        i %= 4
+        self.assertEqual(int(i), 3)
+        i **= 3
+        self.assertEqual(int(i), 27)
+        i <<= 33
+        self.assertEqual(int(i), 27 << 33)
+        i >>= 32
+        self.assertEqual(int(i), 54)
+        i &= -3
+        self.assertEqual(int(i), 54 & -3)
+        i |= 1 << 40
+        self.assertEqual(int(i), (54 & -3) | 1 << 40)
+        i ^= -1
+        self.assertEqual(int(i), ~((54 & -3) | 1 << 40))
+        with self.assertRaises(ZeroDivisionError):
+            i //= 0
+
+    def test_inplace_truediv(self):
+        # this module uses ``from __future__ import division``.
+        i = self.client.Int("test:Int:inplace_truediv")
+        self.client.api.set(i.name, 7)
+        with self.assertRaises(TypeError):
+            i /= 2
+        self.assertEqual(int(i), 7)
+        i += 1
+        self.assertEqual(int(i), 8)
+
+    def test_inplace_concurrent(self):
+        i = self.client.Int("test:Int:inplace_concurrent")
+        self.client.api.set(i.name, 1)
+
+        def double():
+            j = self.client.Int(i.name)
+            for _ in range(10):
+                j *= 2
+
+        threads = [threading.Thread(target=double) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(int(i), 2 ** 30)
+
+
+class test_Float(ClientTestCase):
+
+    def test_operators(self):
+        f = self.client.Float("test:Float:operators")
+        self.client.api.set(f.name, 1.5)
+        f += 1.25
+        self.assertEqual(float(f), 2.75)
+        f -= 0.75
+        self.assertEqual(float(f), 2.0)
+        f *= 1.5
+        self.assertEqual(float(f), 3.0)
+        f /= 4
+        self.assertEqual(float(f), 0.75)
+        f %= -0.5
+        self.assertEqual(float(f), 0.75 % -0.5)
+        self.assertEqual(f + 1, 0.75 % -0.5 + 1)
+        self.assertEqual(1 - f, 1 - 0.75 % -0.5)
+        with self.assertRaises(TypeError):
+            f &= 1
+
+
+class test_StripedCounter(ClientTestCase):
+
+    def test_incr(self):
+        c = self.client.StripedCounter("test:StripedCounter:incr",
+                                       stripes=4)
+        self.assertEqual(int(c), 0)
+
+        def incr():
+            for _ in range(100):
+                c.incr()
+
+        threads = [threading.Thread(target=incr) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        c -= 50
+        self.assertEqual(int(c), 350)
+        self.assertTrue(c.clear())
+        self.assertEqual(int(c), 0)
+
+    def test_staleness(self):
+        name = "test:StripedCounter:staleness"
+        c = self.client.StripedCounter(name, staleness=60)
+        c += 10
+        self.assertEqual(int(c), 10)
+        self.client.api.incr(c.keys[0], 5)
+        c += 1
+        self.assertEqual(int(c), 11)
+        self.assertEqual(int(self.client.StripedCounter(name)), 16)
+
+
+class test_BufferedInt(ClientTestCase):
+
+    def test_buffered_increments(self):
+        name = "test:BufferedInt:increments"
+        self.client.api.set(name, 10)
+        buf = types.CounterBuffer(self.client.api, flush_interval=60,
+                                  flush_size=100)
+        i = self.client.Int(name)
+        b = types.BufferedInt(name, self.client.api, buffer=buf,
+                              staleness=60)
+        b += 5
+        b -= 2
+        self.assertEqual(int(b), 13)
+        self.assertEqual(int(i), 10)
+        b.flush()
+        self.assertEqual(int(i), 13)
+        self.assertEqual(int(b), 13)
+        self.assertEqual(buf.values[name][0], 13)
+
+    def test_flush_size(self):
+        name = "test:BufferedInt:flush_size"
+        buf = types.CounterBuffer(self.client.api, flush_interval=60,
+                                  flush_size=3)
+        b = types.BufferedInt(name, self.client.api, buffer=buf)
+        b += 1
+        b += 1
+        self.assertIsNone(self.client.api.get(name))
+        b += 1
+        self.assertEqual(self.client.api.get(name), "3")
+        self.assertEqual(int(b), 3)
+
+    def test_flush_interval(self):
+        name = "test:BufferedInt:flush_interval"
+        buf = types.CounterBuffer(self.client.api, flush_interval=0.05)
+        b = types.BufferedInt(name, self.client.api, buffer=buf)
+        b += 1
+        b += 1
+        deadline = time.time() + 2
+        while self.client.api.get(name) != "2" and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.client.api.get(name), "2")
+
+    def test_buffers_are_collected(self):
+        import atexit
+        import gc
+        import weakref
+        handlers = len(atexit._exithandlers)
+        b = types.BufferedInt("test:BufferedInt:collected", self.client.api)
+        b += 1
+        b.flush()
+        ref = weakref.ref(b.buffer)
+        del(b)
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertEqual(len(atexit._exithandlers), handlers)
+
+    def test_other_operators_flush(self):
+        name = "test:BufferedInt:operators"
+        b = self.client.Int(name, buffered=True, staleness=60)
+        b += 3
+        b *= 4
+        self.assertEqual(self.client.api.get(name), "12")
+        self.assertEqual(int(b), 12)
+        self.assertIs(self.client.Int(name + "x", buffered=True).buffer,
+                      b.buffer)
+
+
+class test_ZSet(unittest.TestCase):
+
+    def test_operations(self):
+        z = types.ZSet({"c": 3, "b": 2, "a": 1})
+        self.assertListEqual(list(z), ["a", "b", "c"])
+        self.assertEqual(z[-1], "c")
+        self.assertListEqual(z[1:], ["b", "c"])
+        self.assertEqual(z.rank("b"), 1)
+        self.assertEqual(z.revrank("b"), 1)
+        self.assertListEqual(z.range_by_score(2, 3), ["b", "c"])
+        z.add("a", 4)
+        self.assertEqual(z.increment("b", 0.5), 2.5)
+        self.assertListEqual(z.items(), [("b", 2.5), ("c", 3), ("a", 4)])
+        z.remove("c")
+        z.discard("c")
+        self.assertNotIn("c", z)
+        with self.assertRaises(ValueError):
+            z.rank("c")
+        with self.assertRaises(ValueError):
+            types.ZSet({"a": "b"})
+
+    def test_large(self):
+        z = types.ZSet()
+        z._index.load = 4
+        scores = {}
+        for i in xrange(2000):
+            member = "m%s" % (random.randint(0, 500), )
+            if random.random() < 0.3:
+                z.discard(member)
+                scores.pop(member, None)
+            else:
+                scores[member] = random.randint(0, 100)
+                z.add(member, scores[member])
+        expected = sorted(scores, key=lambda m: (scores[m], m))
+        self.assertListEqual(list(z), expected)
+        self.assertEqual(len(z), len(expected))
+        for rank, member in enumerate(expected):
+            self.assertEqual(z.rank(member), rank)
+            self.assertEqual(z[rank], member)
+        self.assertListEqual(z[10:50], expected[10:50])
+        self.assertListEqual(z.range_by_score(20, 40),
+                             [m for m in expected if 20 <= scores[m] <= 40])
 
 
 class QueueCase(ClientTestCase):
@@ -485,6 +1027,8 @@ class QueueCase(ClientTestCase):
         q = self.qtype("test:Queue:put_get")
         q.put("foo")
         self.assertEqual(q.get(block=False), "foo")
+        q.put({"foo": "bar"})
+        self.assertDictEqual(q.get(timeout=1), {"foo": "bar"})
 
     def test_get_raises_Empty(self):
         if not self.qtype:
@@ -504,6 +1048,85 @@ class QueueCase(ClientTestCase):
         with self.assertRaises(q.Full):
             q.put("xuzzy")
 
+    def test_put_many_get_many(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:put_many_get_many")
+        q.put_many(range(100))
+        self.assertEqual(q.qsize(), 100)
+        items = q.get_many(60, timeout=1)
+        self.assertEqual(len(items), 60)
+        items.extend(q.get_many(60, block=False))
+        self.assertItemsEqual(items, range(100))
+        with self.assertRaises(q.Empty):
+            q.get_many(10, block=False)
+
+    def test_get_many_without_pop_count(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:get_many_without_pop_count")
+        q.supports_pop_count = False
+        q.put_many(range(10))
+        self.assertItemsEqual(q.get_many(20, block=False), range(10))
+
+    def test_put_many_raises_Full(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:put_many_raises_Full", maxsize=3)
+        q.put("foo")
+        with self.assertRaises(q.Full):
+            q.put_many(["bar", "baz", "xuzzy"])
+        self.assertEqual(q.qsize(), 1)
+
+    def test_put_block(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:put_block", maxsize=1)
+        q.put("foo")
+        with self.assertRaises(q.Full):
+            q.put("bar", block=True, timeout=0.1)
+
+        consumer = threading.Timer(0.1, q.get)
+        consumer.start()
+        q.put("bar", block=True, timeout=5)
+        consumer.join()
+        self.assertEqual(q.get(block=False), "bar")
+
+    def test_put_block_is_notified(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:put_block_is_notified", maxsize=1)
+        q.max_put_interval = 30
+        q.put("foo")
+        consumer = threading.Timer(0.1, q.get)
+        consumer.start()
+        start = time.time()
+        q.put("bar", block=True, timeout=10)
+        consumer.join()
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(q.get(block=False), "bar")
+
+    def test_put_many_more_than_maxsize(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:put_many_more_than_maxsize", maxsize=2)
+        with self.assertRaises(q.Full):
+            q.put_many(["foo", "bar", "baz"], block=True)
+        self.assertEqual(q.qsize(), 0)
+
+    def test_signal_only_waiters(self):
+        if not self.qtype:
+            return
+        q = self.qtype("test:Queue:signal_only_waiters", maxsize=2)
+        q.put_many(["foo", "bar"])
+        self.assertIn(q.get(), ["foo", "bar"])
+        self.assertEqual(len(q.get_many(2, block=False)), 1)
+        self.assertFalse(self.client.api.exists(q.notify))
+        q.put_many(["foo", "bar"])
+        with self.assertRaises(q.Full):
+            q.put("baz", block=True, timeout=0.1)
+        self.assertFalse(self.client.api.exists(q.waiters))
+
     def test_qsize(self):
         if not self.qtype:
             return
@@ -526,6 +1149,11 @@ class test_Queue(QueueCase):
         for item in items:
             self.assertEqual(q.get(block=False), item)
 
+    def test_get_many_is_FIFO(self):
+        q = self.qtype("test:Queue:get_many_is_FIFO")
+        q.put_many(range(10))
+        self.assertListEqual(q.get_many(10), range(10))
+
 
 class test_LifoQueue(QueueCase):
 
@@ -539,3 +1167,154 @@ class test_LifoQueue(QueueCase):
             q.put(item)
         for item in reversed(items):
             self.assertEqual(q.get(block=False), item)
+
+    def test_get_many_is_LIFO(self):
+        q = self.qtype("test:Queue:get_many_is_LIFO")
+        q.put_many(range(10))
+        self.assertListEqual(q.get_many(10), list(reversed(range(10))))
+
+
+class test_PriorityQueue(ClientTestCase):
+
+    def test_put_get(self):
+        q = self.client.PriorityQueue("test:PriorityQueue:put_get")
+        q.put("low", 10)
+        q.put("high", 1)
+        q.put({"name": "medium"}, 5)
+        self.assertEqual(q.qsize(), 3)
+        self.assertEqual(q.get(timeout=1), "high")
+        self.assertDictEqual(q.get(block=False), {"name": "medium"})
+        self.assertEqual(q.get_nowait(), "low")
+        self.assertTrue(q.empty())
+        with self.assertRaises(q.Empty):
+            q.get(block=False)
+        with self.assertRaises(q.Empty):
+            q.get(timeout=0.1)
+
+    def test_put_many_get_many(self):
+        q = self.client.PriorityQueue("test:PriorityQueue:put_many_get_many")
+        q.put_many((str(i), 100 - i) for i in range(100))
+        self.assertListEqual(q.get_many(10), map(str, range(99, 89, -1)))
+        self.assertEqual(len(q.get_many(200, block=False)), 90)
+
+    def test_maxsize(self):
+        q = self.client.PriorityQueue("test:PriorityQueue:maxsize",
+                                      [("foo", 1), ("bar", 2)], maxsize=3)
+        with self.assertRaises(q.Full):
+            q.put_many([("baz", 3), ("xuzzy", 4)])
+        q.put("baz", 0)
+        self.assertTrue(q.full())
+        with self.assertRaises(q.Full):
+            q.put("xuzzy", 4)
+        self.assertEqual(q.get(), "baz")
+
+    def test_maxsize_change_priority(self):
+        q = self.client.PriorityQueue("test:PriorityQueue:change_priority",
+                                      [("foo", 1), ("bar", 2)], maxsize=2)
+        q.put("bar", 0)
+        q.put_many([("foo", 3), ("foo", 4)])
+        self.assertEqual(q.qsize(), 2)
+        self.assertEqual(q.get(), "bar")
+        self.assertEqual(q.get(), "foo")
+
+    def test_put_block(self):
+        q = self.client.PriorityQueue("test:PriorityQueue:put_block",
+                                      [("foo", 1)], maxsize=1)
+        q.max_put_interval = 30
+        consumer = threading.Timer(0.1, q.get)
+        consumer.start()
+        start = time.time()
+        q.put("bar", 2, block=True, timeout=10)
+        consumer.join()
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(q.get(block=False), "bar")
+        self.assertFalse(self.client.api.exists(q.waiters))
+
+
+class test_DelayedQueue(ClientTestCase):
+
+    def test_claim(self):
+        now = time.time()
+        q = self.client.DelayedQueue("test:DelayedQueue:claim")
+        q.put_many([("later", now + 3600), ("first", now - 20),
+                    ({"name": "second"}, datetime.fromtimestamp(now - 10))])
+        self.assertEqual(len(q), 3)
+        self.assertAlmostEqual(q.next_due(), now - 20, 2)
+        self.assertListEqual(q.claim(max_items=1), ["first"])
+        self.assertListEqual(q.claim(), [{"name": "second"}])
+        self.assertListEqual(q.claim(), [])
+        self.assertListEqual(q.claim(now=now + 3600), ["later"])
+        self.assertIsNone(q.next_due())
+
+    def test_forward(self):
+        now = time.time()
+        q = self.client.DelayedQueue("test:DelayedQueue:forward",
+                                     [(i, now - 10 + i) for i in range(20)])
+        dest = self.client.Queue("test:DelayedQueue:forward:dest")
+        self.assertEqual(q.forward(dest, now=now), 11)
+        self.assertListEqual(dest.get_many(20), range(11))
+        self.assertEqual(len(q), 9)
+
+
+class test_ReliableQueue(QueueCase):
+
+    def setUpQueue(self):
+        self.qtype = self.client.ReliableQueue
+
+    def test_ack(self):
+        q = self.qtype("test:ReliableQueue:ack", consumer="c1")
+        q.put_many(["foo", "bar", "baz"])
+        items = q.get_many(3)
+        self.assertListEqual(items, ["foo", "bar", "baz"])
+        self.assertEqual(len(q.processing), 3)
+        q.ack(items[0])
+        self.assertEqual(len(q.processing), 2)
+        self.assertEqual(q.ack_many(items[1:]), 2)
+        self.assertEqual(len(q.processing), 0)
+
+    def test_prefetch(self):
+        q = self.qtype("test:ReliableQueue:prefetch", prefetch=10)
+        q.put_many(range(20))
+        self.assertEqual(q.get(), 0)
+        self.assertEqual(q.qsize(), 10)
+        self.assertEqual(len(q.processing), 10)
+        self.assertListEqual(q.get_many(12), range(1, 13))
+        self.assertEqual(q.qsize(), 7)
+
+    def test_get_timeout_without_blmove(self):
+        q = self.qtype("test:ReliableQueue:get_timeout_without_blmove")
+        q.supports_lmove = False
+        q.put("foo")
+        self.assertEqual(q.get(timeout=0.1), "foo")
+        start = time.time()
+        with self.assertRaises(q.Empty):
+            # a sub-second timeout must not become 0 (block forever).
+            q.get(timeout=0.1)
+        self.assertLess(time.time() - start, 5)
+
+    def test_requeue_stale(self):
+        q1 = self.qtype("test:ReliableQueue:requeue_stale",
+                        consumer="c1", visibility_timeout=0.1)
+        q2 = self.qtype("test:ReliableQueue:requeue_stale",
+                        consumer="c2", visibility_timeout=0.1)
+        q1.put_many(range(5))
+        self.assertListEqual(q1.get_many(3), [0, 1, 2])
+        self.assertEqual(q2.requeue_stale(), 0)
+        time.sleep(0.2)
+        self.assertEqual(q2.requeue_stale(), 3)
+        self.assertEqual(len(q1.processing), 0)
+        self.assertListEqual(q2.get_many(5), [0, 1, 2, 3, 4])
+
+    def test_requeued_consumer_registers_again(self):
+        name = "test:ReliableQueue:registers_again"
+        q1 = self.qtype(name, consumer="c1")
+        q2 = self.qtype(name, consumer="c2", visibility_timeout=0.1)
+        q1.put_many(range(5))
+        self.assertEqual(q1.get(), 0)
+        time.sleep(0.2)
+        self.assertEqual(q2.requeue_stale(), 1)
+        self.assertIsNone(self.client.api.zscore(q1.consumers, "c1"))
+        q1.get()
+        self.assertIsNotNone(self.client.api.zscore(q1.consumers, "c1"))
+        q1.get(timeout=1)
+        self.assertIsNotNone(self.client.api.zscore(q1.consumers, "c1"))
@@ -1,17 +1,398 @@
+import atexit
 import bisect
-
+import math
+import operator
+import os
+import socket
+import thread
+import threading
+import time
+import weakref
+
+from hashlib import md5
+from itertools import chain, imap, islice, izip
 from Queue import Empty, Full
+from uuid import uuid4
 
 from redis.exceptions import ResponseError
-from redish.utils import mkey
+from redish.utils import mkey, chunks, maybe_datetime, Script
+
+#: Pop up to ``ARGV[2]`` items from a list using the ``ARGV[1]`` command.
+#: Used if the server does not support ``LPOP``/``RPOP`` with a count.
+MULTIPOP_SCRIPT = Script("""
+    local items = {}
+    for i = 1, tonumber(ARGV[2]) do
+        local item = redis.call(ARGV[1], KEYS[1])
+        if not item then
+            break
+        end
+        items[i] = item
+    end
+    return items
+""")
+
+#: Lua function registering the producer ``waiter`` in the set of
+#: producers waiting for room in a bounded queue (expiring after
+#: ``expires`` seconds), or removing it if ``room`` is true.
+WAITER_LUA = """
+    local function register(key, waiter, expires, room)
+        if waiter ~= '' then
+            if room then
+                redis.call('SREM', key, waiter)
+            else
+                redis.call('SADD', key, waiter)
+                redis.call('EXPIRE', key, expires)
+            end
+        end
+    end
+"""
+
+#: Lua function pushing a token to the list ``notify`` for every one of
+#: ``count`` items removed from a bounded queue, but at most one for
+#: every producer in the set ``waiters``.
+SIGNAL_LUA = """
+    local function signal(waiters, notify, count, expires)
+        local tokens = math.min(count, redis.call('SCARD', waiters))
+        if tokens > 0 then
+            for i = 1, tokens do
+                redis.call('LPUSH', notify, 1)
+            end
+            redis.call('EXPIRE', notify, expires)
+        end
+    end
+"""
+
+#: Push the items in ``ARGV[4..]`` to the head of a list, but only if
+#: the list will not have more than ``ARGV[1]`` items.  The producer
+#: ``ARGV[2]`` (if not empty) is added to the set of waiting producers
+#: ``KEYS[2]`` if there was not room, or removed from it otherwise.
+#: Returns the new length of the list, or ``-1`` if there was not room.
+BOUNDED_PUSH_SCRIPT = Script(WAITER_LUA + """
+    local size = redis.call('LLEN', KEYS[1])
+    local count = #ARGV - 3
+    if size + count > tonumber(ARGV[1]) then
+        register(KEYS[2], ARGV[2], ARGV[3], false)
+        return -1
+    end
+    for i = 4, #ARGV, 1000 do
+        redis.call('LPUSH', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+    end
+    register(KEYS[2], ARGV[2], ARGV[3], true)
+    return size + count
+""")
+
+#: Add the ``score, member`` pairs in ``ARGV[4..]`` to a sorted set, but
+#: only if the set will not have more than ``ARGV[1]`` members (members
+#: already in the set only have their scores updated).
+#: Waiting producers are registered like :data:`BOUNDED_PUSH_SCRIPT`.
+#: Returns the new size of the set, or ``-1`` if there was not room.
+BOUNDED_ZADD_SCRIPT = Script(WAITER_LUA + """
+    local size = redis.call('ZCARD', KEYS[1])
+    local count, seen = 0, {}
+    for i = 5, #ARGV, 2 do
+        local member = ARGV[i]
+        if not seen[member] then
+            seen[member] = true
+            if not redis.call('ZSCORE', KEYS[1], member) then
+                count = count + 1
+            end
+        end
+    end
+    if size + count > tonumber(ARGV[1]) then
+        register(KEYS[2], ARGV[2], ARGV[3], false)
+        return -1
+    end
+    for i = 4, #ARGV, 1000 do
+        redis.call('ZADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+    end
+    register(KEYS[2], ARGV[2], ARGV[3], true)
+    return size + count
+""")
+
+#: Tell the producers in the set ``KEYS[1]`` waiting for room in a
+#: bounded queue that ``ARGV[1]`` items were removed, by pushing tokens
+#: to the list ``KEYS[2]`` (expiring after ``ARGV[2]`` seconds).
+SIGNAL_SCRIPT = Script(SIGNAL_LUA + """
+    signal(KEYS[1], KEYS[2], tonumber(ARGV[1]), ARGV[2])
+""")
+
+#: Remove up to ``ARGV[2]`` items from the bounded queue ``KEYS[1]``
+#: using the command ``ARGV[1]`` (``RPOP``, ``LPOP``, ``ZPOPMIN``, or
+#: ``RPOPLPUSH`` to the list ``KEYS[4]``), and signal waiting producers
+#: like :data:`SIGNAL_SCRIPT`, with ``KEYS[2..3]`` and ``ARGV[3]``.
+#: If ``KEYS[5]`` is given, the consumer ``ARGV[5]`` is first added to
+#: this sorted set with the score ``ARGV[4]`` (see :class:`ReliableQueue`).
+#: Returns the items removed (with scores for ``ZPOPMIN``).
+BOUNDED_POP_SCRIPT = Script(SIGNAL_LUA + """
+    local command, count = ARGV[1], tonumber(ARGV[2])
+    local items, removed = {}, 0
+    if KEYS[5] then
+        redis.call('ZADD', KEYS[5], ARGV[4], ARGV[5])
+    end
+    if command == 'ZPOPMIN' then
+        items = redis.call('ZPOPMIN', KEYS[1], count)
+        removed = #items / 2
+    else
+        for i = 1, count do
+            local item
+            if command == 'RPOPLPUSH' then
+                item = redis.call(command, KEYS[1], KEYS[4])
+            else
+                item = redis.call(command, KEYS[1])
+            end
+            if not item then
+                break
+            end
+            items[i] = item
+        end
+        removed = #items
+    end
+    signal(KEYS[2], KEYS[3], removed, ARGV[3])
+    return items
+""")
+
+#: Remove and return up to ``ARGV[2]`` members with a score less than or
+#: equal to ``ARGV[1]`` from the sorted set ``KEYS[1]``, in score order.
+#: If the list ``KEYS[2]`` is given the members are also pushed to it.
+CLAIM_DUE_SCRIPT = Script("""
+    local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1],
+                             'LIMIT', 0, ARGV[2])
+    for i = 1, #items, 1000 do
+        local chunk = {unpack(items, i, math.min(i + 999, #items))}
+        redis.call('ZREM', KEYS[1], unpack(chunk))
+        if KEYS[2] then
+            redis.call('LPUSH', KEYS[2], unpack(chunk))
+        end
+    end
+    return items
+""")
+
+#: Move up to ``ARGV[1]`` items from the tail of the list ``KEYS[1]``
+#: to the head of the list ``KEYS[2]``, and return the items moved.
+#: If ``KEYS[3]`` is given, the consumer ``ARGV[3]`` is first added to
+#: this sorted set with the score ``ARGV[2]`` (see :class:`ReliableQueue`).
+MULTIMOVE_SCRIPT = Script("""
+    if KEYS[3] then
+        redis.call('ZADD', KEYS[3], ARGV[2], ARGV[3])
+    end
+    local items = {}
+    for i = 1, tonumber(ARGV[1]) do
+        local item = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+        if not item then
+            break
+        end
+        items[i] = item
+    end
+    return items
+""")
+
+#: Move all items in the processing lists ``KEYS[3..]`` back to the
+#: tail of the queue ``KEYS[1]``, for the consumers ``ARGV[2..]``
+#: that has not sent a heartbeat to the sorted set ``KEYS[2]``
+#: since ``ARGV[1]``.  Returns the number of items requeued.
+REQUEUE_SCRIPT = Script("""
+    local requeued = 0
+    for i = 3, #KEYS do
+        local consumer = ARGV[i - 1]
+        local seen = redis.call('ZSCORE', KEYS[2], consumer)
+        if seen and tonumber(seen) <= tonumber(ARGV[1]) then
+            local items = redis.call('LRANGE', KEYS[i], 0, -1)
+            for j = 1, #items, 1000 do
+                redis.call('RPUSH', KEYS[1],
+                           unpack(items, j, math.min(j + 999, #items)))
+            end
+            redis.call('DEL', KEYS[i])
+            redis.call('ZREM', KEYS[2], consumer)
+            requeued = requeued + #items
+        end
+    end
+    return requeued
+""")
+
+#: Apply the arithmetic operation ``ARGV[1]`` with the operand ``ARGV[2]``
+#: to the number stored at ``KEYS[1]``, with Python semantics for
+#: floor division, modulo and bitwise operations.  The new value is stored
+#: as an integer if ``ARGV[3]`` is ``"int"``, or as a float otherwise,
+#: and is returned as a string.
+NUMBER_OP_SCRIPT = Script("""
+    local function floordiv(a, b)
+        local q = math.floor(a / b)
+        local r = a - q * b
+        if (b > 0 and r < 0) or (b < 0 and r > 0) then
+            q = q - 1
+        elseif (b > 0 and r >= b) or (b < 0 and r <= b) then
+            q = q + 1
+        end
+        return q
+    end
+    local function bitwise(op, a, b)
+        local word = 4294967296
+        local high = op(math.floor(a / word), math.floor(b / word))
+        local low = op(a % word, b % word) % word
+        return high * word + low
+    end
+    local value = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local op, other = ARGV[1], tonumber(ARGV[2])
+    if not value or not other then
+        return redis.error_reply('ERR value is not a number')
+    end
+    local result
+    if op == 'mul' then
+        result = value * other
+    elseif op == 'floordiv' then
+        result = floordiv(value, other)
+    elseif op == 'truediv' then
+        result = value / other
+    elseif op == 'mod' then
+        result = value - floordiv(value, other) * other
+    elseif op == 'pow' then
+        result = value ^ other
+    elseif op == 'lshift' then
+        result = value * 2 ^ other
+    elseif op == 'rshift' then
+        result = math.floor(value / 2 ^ other)
+    elseif op == 'and' then
+        result = bitwise(bit.band, value, other)
+    elseif op == 'or' then
+        result = bitwise(bit.bor, value, other)
+    elseif op == 'xor' then
+        result = bitwise(bit.bxor, value, other)
+    else
+        return redis.error_reply('ERR unknown operation ' .. op)
+    end
+    if result ~= result or result == math.huge or result == -math.huge then
+        return redis.error_reply('ERR result is not a finite number')
+    end
+    if ARGV[3] == 'int' then
+        if result ~= math.floor(result) then
+            return redis.error_reply('ERR result is not an integer')
+        end
+        if math.abs(result) > 9007199254740992 then
+            return redis.error_reply('ERR result is out of range')
+        end
+        result = string.format('%d', result)
+    else
+        result = string.format('%.17g', result)
+    end
+    redis.call('SET', KEYS[1], result)
+    return result
+""")
+
+#: Apply the change ``ARGV[1]`` (``zadd``, ``zincrby`` or ``zrem``)
+#: for the member ``ARGV[3]`` with the score ``ARGV[2]`` to the sorted
+#: set ``KEYS[1]``, and publish the resulting state of the member
+#: to the channel ``KEYS[2]``.  Returns the reply of the command.
+MIRROR_WRITE_SCRIPT = Script("""
+    local op, member = ARGV[1], ARGV[3]
+    local result, message
+    if op == 'zadd' then
+        result = redis.call('ZADD', KEYS[1], ARGV[2], member)
+        message = 'zadd ' .. ARGV[2] .. ' ' .. member
+    elseif op == 'zincrby' then
+        result = redis.call('ZINCRBY', KEYS[1], ARGV[2], member)
+        message = 'zadd ' .. result .. ' ' .. member
+    else
+        result = redis.call('ZREM', KEYS[1], member)
+        message = 'zrem 0 ' .. member
+    end
+    redis.call('PUBLISH', KEYS[2], message)
+    return result
+""")
 
 
 class Type(object):
-    """Base-class for Redis datatypes."""
+    """Base-class for Redis datatypes.
+
+    :keyword serializer: Optional serializer used to encode the values
+        stored in the datatype, and decode the values returned.
+        Must support the methods ``encode_many(values)`` and
+        ``decode_many(values)``, see :class:`redish.serialization.Serializer`.
+        Default is to store values as they are.
+
+    .. attribute:: chunksize
+
+        Maximum number of values sent with every variadic command
+        when adding many values at once.  Default is ``1000``.
+
+    .. attribute:: pipeline_chunks
+
+        Number of chunks buffered in the pipeline before it is sent
+        to the server.  Default is ``10``.
+
+    .. attribute:: page_size
+
+        Number of elements fetched for every round trip when
+        iterating over the datatype.  Default is ``1000``.
 
-    def __init__(self, name, client):
+    """
+    chunksize = 1000
+    pipeline_chunks = 10
+    page_size = 1000
+    serializer = None
+
+    def __init__(self, name, client, serializer=None):
         self.name = mkey(name)
         self.client = client
+        self.serializer = serializer or self.serializer
+
+    def _encode(self, value):
+        if self.serializer is None:
+            return value
+        return self.serializer.encode(value)
+
+    def _decode(self, value):
+        if self.serializer is None or value is None:
+            return value
+        return self.serializer.decode(value)
+
+    def _encode_many(self, values):
+        if self.serializer is None:
+            return list(values)
+        return self.serializer.encode_many(values)
+
+    def _decode_many(self, values):
+        if self.serializer is None:
+            return list(values)
+        return self.serializer.decode_many(values)
+
+    def _send_chunks(self, command, argchunks):
+        """Send ``command`` once for every list of arguments in
+        ``argchunks`` using a pipeline, and return the replies."""
+        pipe = self.client.pipeline(transaction=False)
+        replies = []
+        for i, args in enumerate(argchunks, 1):
+            pipe.execute_command(command, self.name, *args)
+            if not i % self.pipeline_chunks:
+                replies.extend(pipe.execute())
+        replies.extend(pipe.execute())
+        return replies
+
+    def _scan_pages(self, command):
+        """Iterate over the pages of elements returned by a ``SCAN``-family
+        command (``SSCAN``, ``HSCAN``, ``ZSCAN``)."""
+        cursor = 0
+        while True:
+            cursor, items = self.client.execute_command(command, self.name,
+                                            cursor, "COUNT", self.page_size)
+            if isinstance(items, dict):
+                items = items.items()
+            if items:
+                yield items
+            if not int(cursor):
+                break
+
+    def _range_pages(self, fetch):
+        """Iterate over a range of elements, fetching
+        :attr:`page_size` elements at a time using
+        ``fetch(start, stop)``."""
+        start = 0
+        while True:
+            page = fetch(start, start + self.page_size - 1)
+            if page:
+                yield page
+            if len(page) < self.page_size:
+                break
+            start += self.page_size
 
 
 def Id(name, client):
@@ -22,21 +403,21 @@ def Id(name, client):
 class List(Type):
     """A list."""
 
-    def __init__(self, name, client, initial=None):
-        super(List, self).__init__(name, client)
+    def __init__(self, name, client, initial=None, serializer=None):
+        super(List, self).__init__(name, client, serializer)
         self.extend(initial or [])
 
     def __getitem__(self, index):
         """``x.__getitem__(index) <==> x[index]``"""
         item = self.client.lindex(self.name, index)
-        if item:
-            return item
+        if item is not None:
+            return self._decode(item)
         raise IndexError("list index out of range")
 
     def __setitem__(self, index, value):
         """``x.__setitem__(index, value) <==> x[index] = value``"""
         try:
-            self.client.lset(self.name, index, value)
+            self.client.lset(self.name, index, self._encode(value))
         except ResponseError, exc:
             if "index out of range" in exc.args:
                 raise IndexError("list assignment index out of range")
@@ -51,26 +432,33 @@ class List(Type):
         return repr(self._as_list())
 
     def __iter__(self):
-        """``x.__iter__() <==> iter(x)``"""
-        return iter(self._as_list())
+        """``x.__iter__() <==> iter(x)``
+
+        The list is fetched :attr:`page_size` elements at a time.
+
+        """
+        for page in self._range_pages(lambda start, stop:
+                                self.client.lrange(self.name, start, stop)):
+            for item in self._decode_many(page):
+                yield item
 
     def __getslice__(self, i, j):
         """``x.__getslice__(start, stop) <==> x[start:stop]``"""
         # Redis indices are zero-based, while Python indices are 1-based.
-        return self.client.lrange(self.name, i, j - 1)
+        return self._decode_many(self.client.lrange(self.name, i, j - 1))
 
     def _as_list(self):
-        return self.client.lrange(self.name, 0, -1)
+        return self._decode_many(self.client.lrange(self.name, 0, -1))
 
     copy = _as_list
 
     def append(self, value):
         """Add ``value`` to the end of the list."""
-        return self.client.rpush(self.name, value)
+        return self.client.rpush(self.name, self._encode(value))
 
     def appendleft(self, value):
         """Add ``value`` to the head of the list."""
-        return self.client.lpush(self.name, value)
+        return self.client.lpush(self.name, self._encode(value))
 
     def trim(self, start, stop):
         """Trim the list to the specified range of elements."""
@@ -78,11 +466,11 @@ class List(Type):
 
     def pop(self):
         """Remove and return the last element of the list."""
-        return self.client.rpop(self.name)
+        return self._decode(self.client.rpop(self.name))
 
     def popleft(self):
         """Remove and return the first element of the list."""
-        return self.client.lpop(self.name)
+        return self._decode(self.client.lpop(self.name))
 
     def remove(self, value, count=1):
         """Remove occurences of ``value`` from the list.
@@ -91,33 +479,56 @@ class List(Type):
             Default is to remove a single value.
 
         """
-        count = self.client.lrem(self.name, value, num=count)
+        count = self.client.lrem(self.name, self._encode(value), num=count)
         if not count:
             raise ValueError("%s not in list" % value)
         return count
 
-    def extend(self, iterable):
-        """Append the values in ``iterable`` to this list."""
-        for value in iterable:
-            self.append(value)
+    def extend(self, iterable, chunksize=None):
+        """Append the values in ``iterable`` to this list.
+
+        The values are sent using variadic ``RPUSH`` commands of
+        at most ``chunksize`` values (default is :attr:`chunksize`).
+
+        """
+        self._send_chunks("RPUSH", imap(self._encode_many,
+                            chunks(iterable, chunksize or self.chunksize)))
+
+    def extendleft(self, iterable, chunksize=None):
+        """Add the values in ``iterable`` to the head of this list.
 
-    def extendleft(self, iterable):
-        """Add the values in ``iterable`` to the head of this list."""
-        for value in iterable:
-            self.appendleft(value)
+        The values are sent using variadic ``LPUSH`` commands of
+        at most ``chunksize`` values (default is :attr:`chunksize`).
+
+        """
+        self._send_chunks("LPUSH", imap(self._encode_many,
+                            chunks(iterable, chunksize or self.chunksize)))
 
 
 class Set(Type):
-    """A set."""
+    """A set.
 
-    def __init__(self, name, client, initial=None):
-        super(Set, self).__init__(name, client)
+    **Note:** Members are compared by their encoded value, so the
+    serializer used must always encode equal members the same way.
+
+    """
+
+    def __init__(self, name, client, initial=None, serializer=None):
+        super(Set, self).__init__(name, client, serializer)
         if initial:
             self.update(initial)
 
     def __iter__(self):
-        """``x.__iter__() <==> iter(x)``"""
-        return iter(self._as_set())
+        """``x.__iter__() <==> iter(x)``
+
+        The members are fetched incrementally using ``SSCAN``, so
+        a member may be returned more than once if the set is
+        modified during iteration.
+
+        """
+        for page in self._scan_pages("SSCAN"):
+            for member in self._decode_many(page):
+                yield member
 
     def __repr__(self):
         """``x.__repr__() <==> repr(x)``"""
@@ -125,14 +536,14 @@ class Set(Type):
 
     def __contains__(self, member):
         """``x.__contains__(member) <==> member in x``"""
-        return self.client.sismember(self.name, member)
+        return self.client.sismember(self.name, self._encode(member))
 
     def __len__(self):
         """``x.__len__() <==> len(x)``"""
         return self.client.scard(self.name)
 
     def _as_set(self):
-        return self.client.smembers(self.name)
+        return set(self._decode_many(self.client.smembers(self.name)))
 
     copy = _as_set
 
@@ -142,7 +553,7 @@ class Set(Type):
         This has no effect if the member is already present.
 
         """
-        return self.client.sadd(self.name, member)
+        return self.client.sadd(self.name, self._encode(member))
 
     def remove(self, member):
         """Remove element from set; it must be a member.
@@ -150,7 +561,7 @@ class Set(Type):
         :raises KeyError: if the element is not a member.
 
         """
-        if not self.client.srem(self.name, member):
+        if not self.client.srem(self.name, self._encode(member)):
             raise KeyError(member)
 
     def pop(self):
@@ -161,7 +572,7 @@ class Set(Type):
         """
         member = self.client.spop(self.name)
         if member is not None:
-            return member
+            return self._decode(member)
         raise KeyError()
 
     def union(self, other):
@@ -173,16 +584,24 @@ class Set(Type):
 
         """
         if isinstance(other, self.__class__):
-            return self.client.sunion([self.name, other.name])
+            return set(self._decode_many(
+                        self.client.sunion([self.name, other.name])))
         else:
             return self._as_set().union(other)
 
-    def update(self, other):
-        """Update this set with the union of itself and others."""
+    def update(self, other, chunksize=None):
+        """Update this set with the union of itself and others.
+
+        Members of an iterable are sent using variadic ``SADD``
+        commands of at most ``chunksize`` members (default is
+        :attr:`chunksize`).
+
+        """
         if isinstance(other, self.__class__):
             return self.client.sunionstore(self.name, [self.name, other.name])
         else:
-            return map(self.add, other)
+            return sum(self._send_chunks("SADD", imap(self._encode_many,
+                            chunks(other, chunksize or self.chunksize))))
 
     def intersection(self, other):
         """Return the intersection of two sets as a new set.
@@ -193,7 +612,8 @@ class Set(Type):
 
         """
         if isinstance(other, self.__class__):
-            return self.client.sinter([self.name, other.name])
+            return set(self._decode_many(
+                        self.client.sinter([self.name, other.name])))
         else:
             return self._as_set().intersection(other)
 
@@ -210,23 +630,351 @@ class Set(Type):
 
         """
         if all([isinstance(a, self.__class__) for a in others]):
-            return self.client.sdiff([self.name] + [other.name for other in others])
+            return set(self._decode_many(self.client.sdiff(
+                        [self.name] + [other.name for other in others])))
         else:
             othersets = filter(lambda x: isinstance(x, set), others)
             otherTypes = filter(lambda x: isinstance(x, self.__class__), others)
-            return self.client.sdiff([self.name] + [other.name for other in otherTypes]).difference(*othersets)
+            return set(self._decode_many(self.client.sdiff(
+                        [self.name] + [other.name for other in otherTypes]))
+                       ).difference(*othersets)
 
     def difference_update(self, other):
         """Remove all elements of another set from this set."""
         return self.client.sdiffstore(self.name, [self.name, other.name])
 
 
+class HyperLogLog(Type):
+    """Approximate count of unique members (HyperLogLog).
+
+    Uses at most 12KB of memory on the server, no matter how many
+    members are added, with a standard error of 0.81%.  The members
+    themselves are not stored, and can not be retrieved.
+
+    **Note:** Members are compared by their encoded value, so the
+    serializer used must always encode equal members the same way.
+
+    """
+
+    def __init__(self, name, client, initial=None, serializer=None):
+        super(HyperLogLog, self).__init__(name, client, serializer)
+        if initial:
+            self.update(initial)
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``
+
+        The approximate number of unique members added.
+
+        """
+        return self.client.execute_command("PFCOUNT", self.name)
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<HyperLogLog: %s ~%s>" % (self.name, len(self))
+
+    def add(self, member):
+        """Add member.
+
+        Returns true if the approximated count changed.
+
+        """
+        return bool(self.client.execute_command("PFADD", self.name,
+                                                self._encode(member)))
+
+    def update(self, iterable, chunksize=None):
+        """Add several members.
+
+        Members are sent using variadic ``PFADD`` commands of at most
+        ``chunksize`` members (default is :attr:`chunksize`).
+
+        Returns true if the approximated count changed.
+
+        """
+        return any(self._send_chunks("PFADD", imap(self._encode_many,
+                        chunks(iterable, chunksize or self.chunksize))))
+
+    def count(self, *others):
+        """Return the approximate number of unique members
+        in the union of this and other :class:`HyperLogLog`\ s,
+        without modifying any of them."""
+        return self.client.execute_command("PFCOUNT", self.name,
+                                           *[other.name for other in others])
+
+    def merge(self, *others):
+        """Update this counter with the union of itself and other
+        :class:`HyperLogLog`\ s."""
+        return self.client.execute_command("PFMERGE", self.name,
+                                           *[other.name for other in others])
+
+
+class BitSet(Type):
+    """A set of non-negative integers, stored as a bitmap.
+
+    Every possible member uses one bit, so this is compact for
+    dense sets of small integers (e.g. ids).
+
+    Operations on several members are sent as ``BITFIELD`` commands of
+    at most :attr:`chunksize` members, in a single pipeline.
+
+    """
+
+    def __init__(self, name, client, initial=None):
+        super(BitSet, self).__init__(name, client)
+        if initial:
+            self.set_many(initial)
+
+    def __getitem__(self, offset):
+        """``x.__getitem__(offset) <==> x[offset]``"""
+        return bool(self.client.getbit(self.name, offset))
+
+    def __setitem__(self, offset, value):
+        """``x.__setitem__(offset, value) <==> x[offset] = value``"""
+        self.client.setbit(self.name, offset, value and 1 or 0)
+
+    __contains__ = __getitem__
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``
+
+        The number of bits set.
+
+        """
+        return self.count()
+
+    def __iter__(self):
+        """``x.__iter__() <==> iter(x)``
+
+        Iterate over the offsets of the bits set, fetching
+        :attr:`page_size` bytes at a time.
+
+        """
+        start = 0
+        while True:
+            data = self.client.getrange(self.name, start,
+                                        start + self.page_size - 1)
+            for i, byte in enumerate(imap(ord, data)):
+                if byte:
+                    for bit in xrange(8):
+                        if byte & (128 >> bit):
+                            yield (start + i) * 8 + bit
+            if len(data) < self.page_size:
+                break
+            start += self.page_size
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<BitSet: %s>" % (repr(list(self)), )
+
+    def add(self, offset):
+        """Set the bit at ``offset``.  Returns the previous value."""
+        return bool(self.client.setbit(self.name, offset, 1))
+
+    def discard(self, offset):
+        """Clear the bit at ``offset``.  Returns the previous value."""
+        return bool(self.client.setbit(self.name, offset, 0))
+
+    def set_many(self, offsets, value=True, chunksize=None):
+        """Set (or clear, if ``value`` is false) the bits
+        at several offsets.
+
+        Returns the list of previous values.
+
+        """
+        value = value and 1 or 0
+
+        def bitfield_args(chunk):
+            return [arg for offset in chunk
+                        for arg in ("SET", "u1", offset, value)]
+
+        return map(bool, chain.from_iterable(self._send_chunks("BITFIELD",
+                    imap(bitfield_args,
+                         chunks(offsets, chunksize or self.chunksize)))))
+
+    def get_many(self, offsets, chunksize=None):
+        """Return the values of the bits at several offsets."""
+
+        def bitfield_args(chunk):
+            return [arg for offset in chunk
+                        for arg in ("GET", "u1", offset)]
+
+        return map(bool, chain.from_iterable(self._send_chunks("BITFIELD",
+                    imap(bitfield_args,
+                         chunks(offsets, chunksize or self.chunksize)))))
+
+    def count(self, start=None, end=None):
+        """Return the number of bits set, optionally only between
+        the bytes ``start`` and ``end`` (inclusive)."""
+        if start is None and end is None:
+            return self.client.bitcount(self.name)
+        return self.client.bitcount(self.name, start or 0,
+                                    -1 if end is None else end)
+
+    def bitop(self, operation, dest, *others):
+        """Store the result of the bitwise ``operation`` (``"AND"``,
+        ``"OR"``, ``"XOR"``) of this and other bitsets in the key
+        ``dest``, and return it as a :class:`BitSet`."""
+        self.client.bitop(operation, dest, self.name,
+                          *[other.name for other in others])
+        return self.__class__(dest, self.client)
+
+    def intersection(self, dest, *others):
+        """Store the intersection of this and other bitsets in ``dest``."""
+        return self.bitop("AND", dest, *others)
+
+    def union(self, dest, *others):
+        """Store the union of this and other bitsets in ``dest``."""
+        return self.bitop("OR", dest, *others)
+
+    def symmetric_difference(self, dest, *others):
+        """Store the bits set in an odd number of this and other
+        bitsets in ``dest``."""
+        return self.bitop("XOR", dest, *others)
+
+    def __iand__(self, other):
+        """``x.__iand__(other) <==> x &= other``"""
+        return self.intersection(self.name, other)
+
+    def __ior__(self, other):
+        """``x.__ior__(other) <==> x |= other``"""
+        return self.union(self.name, other)
+
+    def __ixor__(self, other):
+        """``x.__ixor__(other) <==> x ^= other``"""
+        return self.symmetric_difference(self.name, other)
+
+    def clear(self):
+        """Clear all bits."""
+        return self.client.delete(self.name)
+
+
+class BloomFilter(Type):
+    """Probabilistic set membership, using a bitmap.
+
+    Adding a member sets the bits at :attr:`hashes` positions computed
+    from the (encoded) member.  A member is probably present if all of
+    its bits are set, and definitely not present if any of them is not.
+
+    :keyword capacity: Expected number of members.  Default is
+        ``1000000``.
+    :keyword error_rate: Acceptable rate of false positives at
+        :attr:`capacity` members.  Default is ``0.01``.
+    :keyword serializer: Serializer used to encode the members.
+
+    All the bits for a member are set or probed with a single
+    ``BITFIELD`` command, and :meth:`add_many`/:meth:`contains_many`
+    send :attr:`chunksize` members per command in a single pipeline.
+
+    **Note:** The filter must always be used with the same capacity,
+    error rate and serializer.
+
+    .. attribute:: size
+
+        The number of bits in the filter.
+
+    .. attribute:: hashes
+
+        The number of bits set for every member.
+
+    """
+    capacity = 1000000
+    error_rate = 0.01
+    max_size = 2 ** 32
+
+    def __init__(self, name, client, capacity=None, error_rate=None,
+            serializer=None):
+        super(BloomFilter, self).__init__(name, client, serializer)
+        self.capacity = capacity or self.capacity
+        self.error_rate = error_rate or self.error_rate
+        self.size = int(math.ceil(-self.capacity * math.log(self.error_rate)
+                                    / math.log(2) ** 2))
+        if self.size > self.max_size:
+            raise ValueError("Bloom filter would need %s bits, "
+                             "max is %s" % (self.size, self.max_size))
+        self.hashes = max(1, int(round(
+                            float(self.size) / self.capacity * math.log(2))))
+
+    def _offsets(self, member):
+        member = self._encode(member)
+        if isinstance(member, unicode):
+            member = member.encode("utf-8")
+        digest = md5(str(member)).hexdigest()
+        h1, h2 = long(digest[:16], 16), long(digest[16:], 16) | 1
+        return [(h1 + i * h2) % self.size for i in xrange(self.hashes)]
+
+    def _bitfield(self, op, members, chunksize=None):
+        hashes = self.hashes
+        value = op == "SET" and (1, ) or ()
+
+        def bitfield_args(chunk):
+            return [arg for member in chunk
+                        for offset in self._offsets(member)
+                            for arg in (op, "u1", offset) + value]
+
+        bits = list(chain.from_iterable(self._send_chunks("BITFIELD",
+                        imap(bitfield_args,
+                             chunks(members, chunksize or self.chunksize)))))
+        return [bits[i:i + hashes] for i in xrange(0, len(bits), hashes)]
+
+    def add(self, member):
+        """Add member.
+
+        Returns true if the member was not already present.
+
+        """
+        return self.add_many([member])[0]
+
+    def add_many(self, members, chunksize=None):
+        """Add several members.
+
+        Returns a list of booleans, true for every member
+        that was not already present.
+
+        """
+        return [not all(bits) for bits in self._bitfield("SET", members,
+                                                          chunksize)]
+
+    def __contains__(self, member):
+        """``x.__contains__(member) <==> member in x``"""
+        return self.contains_many([member])[0]
+
+    def contains_many(self, members, chunksize=None):
+        """Return a list of booleans, true for every member
+        that is probably present."""
+        return [all(bits) for bits in self._bitfield("GET", members,
+                                                      chunksize)]
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``
+
+        An estimate of the number of members added.
+
+        """
+        bits = self.client.bitcount(self.name)
+        if bits >= self.size:
+            return self.capacity
+        return int(round(-float(self.size) / self.hashes
+                            * math.log(1 - float(bits) / self.size)))
+
+    def __repr__(self):
+        """``x.__repr__() <==> repr(x)``"""
+        return "<BloomFilter: %s size=%s hashes=%s>" % (
+                self.name, self.size, self.hashes)
+
+    def clear(self):
+        """Remove all members."""
+        return self.client.delete(self.name)
+
+
 class SortedSet(Type):
     """A sorted set.
 
     :keyword initial: Initial data to populate the set with,
       must be an iterable of ``(element, score)`` tuples.
 
+    Members are encoded using the serializer, scores are always
+    stored as numbers.
+
     """
 
     class _itemsview(object):
@@ -259,14 +1007,22 @@ class SortedSet(Type):
             else:
                 return self._items(s, s, False, self.withscores)[0]
 
-    def __init__(self, name, client, initial=None):
-        super(SortedSet, self).__init__(name, client)
+    def __init__(self, name, client, initial=None, serializer=None):
+        super(SortedSet, self).__init__(name, client, serializer)
         if initial:
             self.update(initial)
 
     def __iter__(self):
-        """``x.__iter__() <==> iter(x)``"""
-        return iter(self._as_set())
+        """``x.__iter__() <==> iter(x)``
+
+        The members are fetched :attr:`page_size` members at a time,
+        ordered by score.
+
+        """
+        for page in self._range_pages(lambda start, stop:
+                                self.client.zrange(self.name, start, stop)):
+            for member in self._decode_many(page):
+                yield member
 
     def __getitem__(self, s):
         if isinstance(s, slice):
@@ -275,7 +1031,7 @@ class SortedSet(Type):
             j = j - 1
         else:
             i = j = s
-        return self.client.zrange(self.name, i, j)
+        return self._decode_many(self.client.zrange(self.name, i, j))
 
     def __len__(self):
         """``x.__len__() <==> len(x)``"""
@@ -285,56 +1041,204 @@ class SortedSet(Type):
         """``x.__repr__() <==> repr(x)``"""
         return "<SortedSet: %s>" % (repr(list(self._as_set())), )
 
+    def _decode_scored(self, pairs):
+        members = self._decode_many([member for member, _ in pairs])
+        return zip(members, [score for _, score in pairs])
+
+    def _decode_range(self, values, withscores=False):
+        if withscores:
+            return self._decode_scored(values)
+        return self._decode_many(values)
+
     def add(self, member, score):
         """Add the specified member to the sorted set, or update the score
         if it already exist."""
-        return self.client.zadd(self.name, member, score)
+        return self.client.zadd(self.name, self._encode(member), score)
 
     def remove(self, member):
         """Remove member."""
-        if not self.client.zrem(self.name, member):
+        if not self.client.zrem(self.name, self._encode(member)):
             raise KeyError(member)
 
     def revrange(self, start=0, stop=-1):
         stop = stop is None and -1 or stop
-        return self.client.zrevrange(self.name, start, stop)
+        return self._decode_many(self.client.zrevrange(self.name,
+                                                       start, stop))
 
     def discard(self, member):
         """Discard member."""
-        self.client.zrem(self.name, member)
+        self.client.zrem(self.name, self._encode(member))
 
     def increment(self, member, amount=1):
         """Increment the score of ``member`` by ``amount``."""
-        return self.client.zincrby(self.name, member, amount)
+        return self.client.zincrby(self.name, self._encode(member), amount)
 
     def rank(self, member):
         """Rank the set with scores being ordered from low to high."""
-        return self.client.zrank(self.name, member)
+        return self.client.zrank(self.name, self._encode(member))
 
     def revrank(self, member):
         """Rank the set with scores being ordered from high to low."""
-        return self.client.zrevrank(self.name, member)
+        return self.client.zrevrank(self.name, self._encode(member))
 
     def score(self, member):
         """Return the score associated with the specified member."""
-        return self.client.zscore(self.name, member)
+        return self.client.zscore(self.name, self._encode(member))
 
-    def range_by_score(self, min, max, num=None, withscores=False):
+    def range_by_score(self, min, max, num=None, withscores=False,
+            start=None):
         """Return all the elements with score >= min and score <= max
-        (a range query) from the sorted set."""
-        return self.client.zrangebyscore(self.name, min, max, num=num,
-                                         withscores=withscores)
+        (a range query) from the sorted set.
+
+        :keyword num: Return at most ``num`` elements.
+        :keyword start: Skip the first ``start`` elements.
+
+        """
+        if num is not None or start is not None:
+            start, num = start or 0, -1 if num is None else num
+        return self._decode_range(self.client.zrangebyscore(self.name,
+                                            min, max, start=start, num=num,
+                                            withscores=withscores),
+                                  withscores)
+
+    def range_by_lex(self, min, max, num=None, start=None):
+        """Return the members between ``min`` and ``max`` in
+        lexicographical order, for sets where all members have
+        the same score.
+
+        ``min`` and ``max`` are given as for ``ZRANGEBYLEX``
+        (e.g. ``"[a"``, ``"(b"``, ``"-"``, ``"+"``), and are compared
+        to the encoded members, so this is only meaningful when the
+        members are stored as plain strings.
+
+        :keyword num: Return at most ``num`` members.
+        :keyword start: Skip the first ``start`` members.
+
+        """
+        limit = ()
+        if num is not None or start is not None:
+            limit = ("LIMIT", start or 0, -1 if num is None else num)
+        return self._decode_many(self.client.execute_command("ZRANGEBYLEX",
+                                            self.name, min, max, *limit))
+
+    def _score_pages(self, fetch, start, page_size):
+        """Iterate over pages of ``(member, score)`` pairs, using
+        ``fetch(start, offset, count)`` to get every page.
+
+        Every page starts at the score of the last element of the previous
+        page, skipping the elements with that score already returned,
+        so the server does not have to skip all the previous pages.
+
+        """
+        offset = 0
+        page_size = page_size or self.page_size
+        while True:
+            page = fetch(start, offset, page_size)
+            if page:
+                yield page
+            if len(page) < page_size:
+                break
+            last = page[-1][1]
+            ties = 0
+            for _, score in reversed(page):
+                if score != last:
+                    break
+                ties += 1
+            if ties == len(page) and last == start:
+                offset += ties
+            else:
+                start, offset = last, ties
+
+    def _iter_range_by_score(self, fetch, start, page_size, withscores):
+        for page in self._score_pages(fetch, start, page_size):
+            if not withscores:
+                page = [member for member, _ in page]
+            for item in self._decode_range(page, withscores):
+                yield item
+
+    def iter_range_by_score(self, min, max, page_size=None,
+            withscores=False):
+        """Iterate over the elements with score >= min and score <= max,
+        ordered by score, fetching ``page_size`` elements at a time
+        (default is :attr:`page_size`)."""
+        return self._iter_range_by_score(lambda start, offset, count:
+                    self.client.zrangebyscore(self.name, start, max,
+                                              start=offset, num=count,
+                                              withscores=True),
+                    min, page_size, withscores)
+
+    def iter_revrange_by_score(self, max, min, page_size=None,
+            withscores=False):
+        """Iterate over the elements with score <= max and score >= min,
+        ordered by score from high to low, fetching ``page_size`` elements
+        at a time (default is :attr:`page_size`)."""
+        return self._iter_range_by_score(lambda start, offset, count:
+                    self.client.zrevrangebyscore(self.name, start, min,
+                                                 start=offset, num=count,
+                                                 withscores=True),
+                    max, page_size, withscores)
+
+    def _iter_range_by_lex(self, command, start, end, page_size):
+        page_size = page_size or self.page_size
+        while True:
+            page = self.client.execute_command(command, self.name,
+                                        start, end, "LIMIT", 0, page_size)
+            for member in self._decode_many(page):
+                yield member
+            if len(page) < page_size:
+                break
+            start = "(" + page[-1]
+
+    def iter_range_by_lex(self, min, max, page_size=None):
+        """Iterate over the members between ``min`` and ``max`` in
+        lexicographical order, fetching ``page_size`` members at a time
+        (default is :attr:`page_size`).  See :meth:`range_by_lex`."""
+        return self._iter_range_by_lex("ZRANGEBYLEX", min, max, page_size)
+
+    def iter_revrange_by_lex(self, max, min, page_size=None):
+        """Iterate over the members between ``max`` and ``min`` in
+        reverse lexicographical order, fetching ``page_size`` members at
+        a time (default is :attr:`page_size`).  See :meth:`range_by_lex`."""
+        return self._iter_range_by_lex("ZREVRANGEBYLEX", max, min, page_size)
+
+    def update(self, iterable, chunksize=None, nx=False, xx=False,
+            gt=False, lt=False):
+        """Add several members to the sorted set, or update their
+        scores if they already exist.
+
+        :param iterable: Iterable of ``(member, score)`` tuples.
+        :keyword chunksize: Maximum number of members sent with every
+            variadic ``ZADD`` command. Default is :attr:`chunksize`.
+        :keyword nx: Only add new members, never update scores.
+        :keyword xx: Only update scores of existing members,
+            never add new members.
+        :keyword gt: Only update scores if the new score is greater
+            than the current score.
+        :keyword lt: Only update scores if the new score is less
+            than the current score.
+
+        Returns the number of new members added.
+
+        """
+        flags = [flag for flag, enabled in (("NX", nx), ("XX", xx),
+                                            ("GT", gt), ("LT", lt))
+                        if enabled]
 
-    def update(self, iterable):
-        for member, score in iterable:
-            self.add(member, score)
+        def zadd_args(chunk):
+            members = self._encode_many([member for member, _ in chunk])
+            return flags + [arg for member, (_, score) in izip(members, chunk)
+                                for arg in (score, member)]
+
+        return sum(self._send_chunks("ZADD", imap(zadd_args,
+                        chunks(iterable, chunksize or self.chunksize))))
 
     def _as_set(self):
-        return self.client.zrange(self.name, 0, -1)
+        return self._decode_many(self.client.zrange(self.name, 0, -1))
 
     def items(self, start=0, end=-1, desc=False, withscores=False):
-        return self.client.zrange(self.name, start, end,
-                                  desc=desc, withscores=withscores)
+        return self._decode_range(self.client.zrange(self.name, start, end,
+                                            desc=desc, withscores=withscores),
+                                  withscores)
 
     def itemsview(self, start=0, end=-1, desc=False):
         return self._itemsview(self, start, end, desc, withscores=True)
@@ -345,19 +1249,307 @@ class SortedSet(Type):
     copy = _as_set
 
 
+def _parse_score_bound(bound):
+    """Parse a ``ZRANGEBYSCORE`` score bound, e.g. ``1.5``, ``"(1.5"``
+    or ``"-inf"``, into a ``(score, exclusive)`` tuple."""
+    if isinstance(bound, basestring) and bound.startswith("("):
+        return float(bound[1:]), True
+    return float(bound), False
+
+
+class MirroredSortedSet(SortedSet):
+    """A sorted set with a local replica.
+
+    Reads (ranks, scores, ranges and slices) are served from a local
+    :class:`ZSet`, and writes are sent to the server, and then applied
+    to the replica.
+
+    Every write also publishes the resulting state of the member to
+    the channel :attr:`channel`, atomically with the write, so that
+    all mirrors of the set can apply it.  Mirrors listen for changes in
+    a background thread, which also reloads the whole set every
+    :attr:`resync_interval` seconds, in case changes were missed (e.g.
+    because the set was modified without using a mirror, or after
+    a connection failure).  Changes received while the set is reloaded
+    are applied to the new replica, and reads keep using the old
+    replica until then.
+
+    :keyword resync_interval: Maximum number of seconds between full
+        reloads of the set.  Default is ``60.0``.
+    :keyword listen: Listen for changes made by other mirrors.
+        Default is ``True``.
+
+    .. attribute:: local
+
+        The local replica, as a :class:`ZSet` of encoded members.
+
+    """
+    resync_interval = 60.0
+
+    def __init__(self, name, client, initial=None, serializer=None,
+            resync_interval=None, listen=True):
+        super(MirroredSortedSet, self).__init__(name, client,
+                                                serializer=serializer)
+        self.channel = "%s:changes" % (self.name, )
+        self.resync_interval = resync_interval or self.resync_interval
+        self._mutex = threading.RLock()
+        self._resync_mutex = threading.Lock()
+        self._closed = threading.Event()
+        self._changes = None
+        self._pubsub = None
+        self._listener = None
+        if listen:
+            self._pubsub = self.client.pubsub()
+            self._pubsub.subscribe(self.channel)
+            self._pubsub.get_message(timeout=1.0)  # wait until subscribed
+        self.resync()
+        if listen:
+            self._listener = threading.Thread(target=self._listen)
+            self._listener.setDaemon(True)
+            self._listener.start()
+        if initial:
+            self.update(initial)
+
+    def _listen(self):
+        timeout = min(self.resync_interval, 1.0)
+        try:
+            while not self._closed.is_set():
+                message = self._pubsub.get_message(timeout=timeout)
+                if message and message["type"] == "message":
+                    self._apply(message["data"])
+                if time.time() - self._synced_at > self.resync_interval:
+                    self.resync()
+        finally:
+            self._pubsub.close()
+
+    def _apply(self, message):
+        op, score, member = message.split(" ", 2)
+        if op == "sync":
+            return self.resync()
+        with self._mutex:
+            if self._changes is not None:
+                self._changes.append((op, score, member))
+            self._apply_to(self.local, op, score, member)
+
+    def _apply_to(self, local, op, score, member):
+        if op == "zadd":
+            local.add(member, float(score))
+        elif op == "zrem":
+            local.discard(member)
+
+    def _write(self, op, member, score=0):
+        result = MIRROR_WRITE_SCRIPT(self.client,
+                                     keys=[self.name, self.channel],
+                                     args=[op, score, member])
+        if op == "zrem":
+            self._apply("zrem 0 %s" % (member, ))
+        else:
+            self._apply("zadd %s %s" % (op == "zincrby" and result or
+                                        repr(float(score)), member))
+        return result
+
+    def resync(self):
+        """Reload the local replica from the server.
+
+        Changes applied while the set is fetched are applied to the new
+        replica before it replaces the old one.
+
+        """
+        with self._resync_mutex:
+            with self._mutex:
+                self._changes = []
+            try:
+                local = ZSet(self.client.zrange(self.name, 0, -1,
+                                                withscores=True))
+                with self._mutex:
+                    for change in self._changes:
+                        self._apply_to(local, *change)
+                    self.local = local
+                    self._synced_at = time.time()
+            finally:
+                with self._mutex:
+                    self._changes = None
+
+    def close(self):
+        """Stop listening for changes.
+
+        The listener thread exits (and closes its connection)
+        within a second.
+
+        """
+        self._closed.set()
+
+    def _replica(self):
+        # The listener reloads the set, unless there is none.
+        if (self._listener is None or not self._listener.is_alive()) and \
+                time.time() - self._synced_at > self.resync_interval:
+            self.resync()
+        return self.local
+
+    def _range(self, start, end, desc=False, withscores=False):
+        """Return the members between the indices ``start`` and ``end``
+        (inclusive, like ``ZRANGE``)."""
+        with self._mutex:
+            local = self._replica()
+            size = len(local)
+            if start < 0:
+                start += size
+            if end < 0:
+                end += size
+            start, end = max(start, 0), min(end, size - 1)
+            if start > end:
+                return []
+            if desc:
+                start, end = size - 1 - end, size - 1 - start
+            members = local[start:end + 1]
+            if desc:
+                members.reverse()
+            if withscores:
+                members = [(member, local.score(member))
+                                for member in members]
+        return self._decode_range(members, withscores)
+
+    def __iter__(self):
+        """``x.__iter__() <==> iter(x)``"""
+        return iter(self._range(0, -1))
+
+    def __getitem__(self, s):
+        if isinstance(s, slice):
+            i = s.start or 0
+            j = s.stop or -1
+            j = j - 1
+        else:
+            i = j = s
+        return self._range(i, j)
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``"""
+        return len(self._replica())
+
+    def __contains__(self, member):
+        """``x.__contains__(member) <==> member in x``"""
+        return self._encode(member) in self._replica()
+
+    def add(self, member, score):
+        """Add the specified member to the sorted set, or update the score
+        if it already exist."""
+        return self._write("zadd", self._encode(member), score)
+
+    def remove(self, member):
+        """Remove member."""
+        if not self._write("zrem", self._encode(member)):
+            raise KeyError(member)
+
+    def discard(self, member):
+        """Discard member."""
+        self._write("zrem", self._encode(member))
+
+    def increment(self, member, amount=1):
+        """Increment the score of ``member`` by ``amount``."""
+        return float(self._write("zincrby", self._encode(member), amount))
+
+    def update(self, iterable, chunksize=None, **flags):
+        """Add several members to the sorted set, or update their
+        scores if they already exist.
+
+        The replica is reloaded when done, and all other mirrors
+        are told to reload theirs.
+        See :meth:`SortedSet.update`.
+
+        """
+        added = super(MirroredSortedSet, self).update(iterable, chunksize,
+                                                      **flags)
+        self.resync()
+        self.client.publish(self.channel, "sync 0 ")
+        return added
+
+    def revrange(self, start=0, stop=-1):
+        stop = stop is None and -1 or stop
+        return self._range(start, stop, desc=True)
+
+    def rank(self, member):
+        """Rank the set with scores being ordered from low to high."""
+        with self._mutex:
+            try:
+                return self._replica().rank(self._encode(member))
+            except ValueError:
+                return None
+
+    def revrank(self, member):
+        """Rank the set with scores being ordered from high to low."""
+        with self._mutex:
+            try:
+                return self._replica().revrank(self._encode(member))
+            except ValueError:
+                return None
+
+    def score(self, member):
+        """Return the score associated with the specified member."""
+        member = self._encode(member)
+        with self._mutex:
+            local = self._replica()
+            if member in local:
+                return local.score(member)
+
+    def range_by_score(self, min, max, num=None, withscores=False,
+            start=None):
+        """Return all the elements with score >= min and score <= max
+        (a range query) from the sorted set."""
+        min, min_exclusive = _parse_score_bound(min)
+        max, max_exclusive = _parse_score_bound(max)
+        with self._mutex:
+            members = [(member, score) for member, score in
+                        self._replica().range_by_score(min, max, True)
+                            if not (min_exclusive and score == min or
+                                    max_exclusive and score == max)]
+        if not withscores:
+            members = [member for member, _ in members]
+        start = start or 0
+        end = None if num is None or num < 0 else start + num
+        return self._decode_range(members[start:end], withscores)
+
+    def _as_set(self):
+        return self._range(0, -1)
+
+    def items(self, start=0, end=-1, desc=False, withscores=False):
+        return self._range(start, end, desc, withscores)
+
+    copy = _as_set
+
+
 class Dict(Type):
-    """A dictionary."""
+    """A dictionary.
+
+    Values are encoded using the serializer, keys are always
+    stored as strings.
+
+    :keyword cache: Optional :class:`redish.cache.LocalCache` instance
+        used to cache values locally.
 
-    def __init__(self, name, client, initial=None, **extra):
-        super(Dict, self).__init__(name, client)
+    """
+    cache = None
+
+    def __init__(self, name, client, initial=None, cache=None,
+            serializer=None, **extra):
+        super(Dict, self).__init__(name, client, serializer)
+        if cache is not None:
+            self.cache = cache
         initial = dict(initial or {}, **extra)
         if initial:
             self.update(initial)
 
     def __getitem__(self, key):
         """``x.__getitem__(key) <==> x[key]``"""
+        if self.cache is not None:
+            try:
+                return self.cache.get(self.name, key)
+            except KeyError:
+                version = self.cache.version()
         value = self.client.hget(self.name, key)
         if value is not None:
+            value = self._decode(value)
+            if self.cache is not None:
+                self.cache.set(self.name, value, key, version=version)
             return value
         if hasattr(self.__class__, "__missing__"):
             return self.__class__.__missing__(self, key)
@@ -365,11 +1557,15 @@ class Dict(Type):
 
     def __setitem__(self, key, value):
         """``x.__setitem__(key, value) <==> x[key] = value``"""
-        return self.client.hset(self.name, key, value)
+        result = self.client.hset(self.name, key, self._encode(value))
+        self._invalidate()
+        return result
 
     def __delitem__(self, key):
         """``x.__delitem__(key) <==> del(x[key])``"""
-        if not self.client.hdel(self.name, key):
+        deleted = self.client.hdel(self.name, key)
+        self._invalidate()
+        if not deleted:
             raise KeyError(key)
 
     def __contains__(self, key):
@@ -388,13 +1584,17 @@ class Dict(Type):
         """``x.__repr__() <==> repr(x)``"""
         return repr(self._as_dict())
 
+    def _decode_items(self, items):
+        values = self._decode_many([value for _, value in items])
+        return zip([key for key, _ in items], values)
+
     def keys(self):
         """Returns the list of keys present in this dictionary."""
         return self.client.hkeys(self.name)
 
     def values(self):
         """Returns the list of values present in this dictionary."""
-        return self.client.hvals(self.name)
+        return self._decode_many(self.client.hvals(self.name))
 
     def items(self):
         """This dictionary as a list of ``(key, value)`` pairs, as
@@ -403,16 +1603,28 @@ class Dict(Type):
 
     def iteritems(self):
         """Returns an iterator over the ``(key, value)`` items present in this
-        dictionary."""
-        return iter(self.items())
+        dictionary.
+
+        The items are fetched incrementally using ``HSCAN``, so
+        an item may be returned more than once if the dictionary is
+        modified during iteration.
+
+        """
+        for page in self._scan_pages("HSCAN"):
+            if not isinstance(page[0], tuple):
+                page = zip(page[::2], page[1::2])
+            for item in self._decode_items(page):
+                yield item
 
     def iterkeys(self):
         """Returns an iterator over the keys present in this dictionary."""
-        return iter(self.keys())
+        for key, _ in self.iteritems():
+            yield key
 
     def itervalues(self):
         """Returns an iterator over the values present in this dictionary."""
-        return iter(self.values())
+        for _, value in self.iteritems():
+            yield value
 
     def has_key(self, key):
         """Returns ``True`` if ``key`` is present in this dictionary,
@@ -461,28 +1673,74 @@ class Dict(Type):
 
     def update(self, other):
         """Update this dictionary with another."""
-        return self.client.hmset(self.name, other)
+        keys, values = [], []
+        for key, value in dict(other).iteritems():
+            keys.append(key)
+            values.append(value)
+        result = self.client.hmset(self.name,
+                                   dict(zip(keys, self._encode_many(values))))
+        self._invalidate()
+        return result
+
+    def _invalidate(self):
+        if self.cache is not None:
+            self.cache.invalidate(self.name)
 
     def _as_dict(self):
-        return self.client.hgetall(self.name)
+        return dict(self._decode_items(
+                        self.client.hgetall(self.name).items()))
 
     copy = _as_dict
 
 
 class Queue(Type):
-    """FIFO Queue."""
+    """FIFO Queue.
+
+    If :attr:`maxsize` is set, items are only added if there is room
+    for them, checked atomically by the server.  Producers blocked on
+    a full queue register in the ``"name:waiters"`` set, and wait for
+    a token on the ``"name:notify"`` list with ``BLPOP``.  Consumers
+    push a token for every item they remove, in the same command, but
+    only while producers are waiting.
+
+    .. attribute:: max_put_interval
+
+        Maximum number of seconds a blocking put waits for a token
+        before checking the queue again, in case a token was taken by
+        another producer.
+
+    .. attribute:: notify_expires
+
+        Number of seconds tokens are kept when no producer is waiting.
+
+    """
 
     Empty = Empty
     Full = Full
-
-    def __init__(self, name, client, initial=None, maxsize=0):
-        super(Queue, self).__init__(name, client)
-        self.list = List(name, client, initial)
+    supports_pop_count = True
+    supports_float_timeout = True
+    max_put_interval = 1.0
+    notify_expires = 10
+    _put_script = BOUNDED_PUSH_SCRIPT
+
+    def __init__(self, name, client, initial=None, maxsize=0,
+            serializer=None):
+        super(Queue, self).__init__(name, client, serializer)
+        self.list = List(name, client, initial, serializer=self.serializer)
         self.maxsize = maxsize
-        self._pop = self.list.pop
+        self._pop = self.client.rpop
+        self._pop_command = "RPOP"
         self._bpop = self.client.brpop
         self._append = self.list.appendleft
 
+    @property
+    def notify(self):
+        return mkey((self.name, "notify"))
+
+    @property
+    def waiters(self):
+        return mkey((self.name, "waiters"))
+
     def empty(self):
         """Return ``True`` if the queue is empty, or ``False``
         otherwise (not reliable!)."""
@@ -512,10 +1770,21 @@ class Queue(Type):
         """
         if not block:
             return self.get_nowait()
-        item = self._bpop([self.name], timeout=timeout)
-        if item is not None:
-            return item
-        raise Empty
+        if self.maxsize:
+            # signalling producers after a blocking pop is another
+            # round trip, so only block if the queue is empty.
+            try:
+                return self.get_nowait()
+            except Empty:
+                pass
+        return self._get_blocking(timeout)
+
+    def _get_blocking(self, timeout=None):
+        item = self._bpop([self.name], timeout=timeout or 0)
+        if item is None:
+            raise Empty()
+        self._signal_space(1)
+        return self._decode(item[1])
 
     def get_nowait(self):
         """Remove and return an item from the queue without blocking.
@@ -523,16 +1792,130 @@ class Queue(Type):
         :raises Queue.Empty: if an item is not immediately available.
 
         """
-        item = self._pop()
+        if self.maxsize:
+            items = self._pop_many(1)
+            if not items:
+                raise Empty()
+            return self._decode(items[0])
+        item = self._pop(self.name)
         if item is not None:
-            return item
+            return self._decode(item)
         raise Empty()
 
-    def put(self, item, **kwargs):
-        """Put an item into the queue."""
-        if self.full():
+    def get_many(self, max_items, block=True, timeout=None):
+        """Remove and return up to ``max_items`` items from the queue.
+
+        The items immediately available are removed in a single
+        command.  If there are none and ``block`` is ``True``, this
+        waits for the first item like :meth:`get`, after which any
+        other items available are removed.
+
+        :raises Queue.Empty: if no items were available.
+
+        """
+        items = self._decode_many(self._pop_many(max_items))
+        if not items and block:
+            items.append(self._get_blocking(timeout))
+            if max_items > 1:
+                items.extend(self._decode_many(
+                                self._pop_many(max_items - 1)))
+        if not items:
+            raise Empty()
+        return items
+
+    def _pop_bounded(self, command, count, keys=(), args=()):
+        return BOUNDED_POP_SCRIPT(self.client,
+                    keys=[self.name, self.waiters, self.notify] + list(keys),
+                    args=[command, count, self.notify_expires] + list(args))
+
+    def _pop_many(self, count):
+        if self.maxsize:
+            return self._pop_bounded(self._pop_command, count)
+        if self.supports_pop_count:
+            try:
+                return self.client.execute_command(self._pop_command,
+                                                   self.name, count) or []
+            except ResponseError, exc:
+                if "wrong number of arguments" not in str(exc):
+                    raise
+                self.supports_pop_count = False
+        return MULTIPOP_SCRIPT(self.client, keys=[self.name],
+                               args=[self._pop_command, count])
+
+    def put(self, item, block=False, timeout=None):
+        """Put an item into the queue.
+
+        If :attr:`maxsize` is set and the queue is full, this raises
+        :exc:`Queue.Full` immediately, unless ``block`` is ``True``, in
+        which case it waits for room in the queue, for at most
+        ``timeout`` seconds if given.
+
+        """
+        if not self.maxsize:
+            return self._append(item)
+        self._put_bounded([self._encode(item)], 1, block, timeout)
+
+    def put_many(self, items, block=False, timeout=None):
+        """Put several items into the queue.
+
+        The items are sent using variadic push commands, see
+        :meth:`List.extendleft`.  If :attr:`maxsize` is set, either all
+        or none of the items are added, see :meth:`put`.
+
+        :raises Queue.Full: if there is not room for all of the items,
+            or immediately if there are more than :attr:`maxsize` items.
+
+        """
+        if not self.maxsize:
+            return self.list.extendleft(items)
+        values = self._encode_many(items)
+        self._put_bounded(values, len(values), block, timeout)
+
+    def _put_bounded(self, args, size, block=False, timeout=None):
+        if size > self.maxsize:
+            raise Full()  # there will never be room.
+        args = [self.maxsize, "", self.notify_expires] + args
+        keys = [self.name, self.waiters]
+        if self._put_script(self.client, keys=keys, args=args) >= 0:
+            return
+        if not block:
             raise Full()
-        self._append(item)
+        deadline = timeout is not None and time.time() + timeout or None
+        args[1] = waiter = uuid4().hex
+        try:
+            while self._put_script(self.client, keys=keys, args=args) < 0:
+                interval = self.max_put_interval
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise Full()
+                    interval = min(interval, remaining)
+                self._wait_for_space(interval)
+        except:
+            self.client.srem(self.waiters, waiter)
+            raise
+
+    def _signal_space(self, count):
+        """Tell producers blocked on a full queue that ``count`` items
+        were removed by a blocking command."""
+        if self.maxsize and count:
+            SIGNAL_SCRIPT(self.client, keys=[self.waiters, self.notify],
+                          args=[count, self.notify_expires])
+
+    def _wait_for_space(self, timeout):
+        """Wait at most ``timeout`` seconds for a consumer to remove an
+        item."""
+        if self.supports_float_timeout:
+            try:
+                return self.client.execute_command("BLPOP", self.notify,
+                                                   timeout)
+            except ResponseError, exc:
+                if "timeout is not" not in str(exc):
+                    raise
+                self.supports_float_timeout = False
+        # Redis < 6.0 only takes whole seconds, and 0 blocks forever.
+        return self.client.execute_command("BLPOP", self.notify,
+                                    max(1, int(math.ceil(timeout))))
 
     def qsize(self):
         """Returns the current size of the queue."""
@@ -543,12 +1926,404 @@ class LifoQueue(Queue):
     """Variant of :class:`Queue` that retrieves most recently added
     entries first."""
 
-    def __init__(self, name, client, initial=None, maxsize=0):
-        super(LifoQueue, self).__init__(name, client, initial, maxsize)
-        self._pop = self.list.popleft
+    def __init__(self, name, client, initial=None, maxsize=0,
+            serializer=None):
+        super(LifoQueue, self).__init__(name, client, initial, maxsize,
+                                        serializer)
+        self._pop = self.client.lpop
+        self._pop_command = "LPOP"
         self._bpop = self.client.blpop
 
 
+class PriorityQueue(Queue):
+    """Variant of :class:`Queue` that retrieves entries in priority order
+    (lowest first), stored as a sorted set.
+
+    **Note:** As with sorted sets, an item can only be present once in the
+    queue: putting an item already in the queue changes its priority.
+    Items of the same priority are retrieved in the order of their
+    encoded value.  Requires Redis 5.0 or later.
+
+    """
+    _put_script = BOUNDED_ZADD_SCRIPT
+
+    def __init__(self, name, client, initial=None, maxsize=0,
+            serializer=None):
+        Type.__init__(self, name, client, serializer)
+        self.maxsize = maxsize
+        if initial:
+            self.put_many(initial)
+
+    def empty(self):
+        """Return ``True`` if the queue is empty, or ``False``
+        otherwise (not reliable!)."""
+        return not self.qsize()
+
+    def full(self):
+        """Return ``True`` if the queue is full, ``False``
+        otherwise (not reliable!).
+
+        Only applicable if :attr:`maxsize` is set.
+
+        """
+        return self.maxsize and self.qsize() >= self.maxsize or False
+
+    def qsize(self):
+        """Returns the current size of the queue."""
+        return self.client.zcard(self.name)
+
+    def get(self, block=True, timeout=None):
+        """Remove and return the item with the lowest priority value.
+
+        See :meth:`Queue.get`.
+
+        """
+        return super(PriorityQueue, self).get(block, timeout)
+
+    def _get_blocking(self, timeout=None):
+        item = self.client.execute_command("BZPOPMIN", self.name,
+                                           timeout or 0)
+        if not item:
+            raise Empty()
+        self._signal_space(1)
+        return self._decode(item[1])
+
+    def get_nowait(self):
+        """Remove and return the item with the lowest priority value
+        without blocking.
+
+        :raises Queue.Empty: if an item is not immediately available.
+
+        """
+        return self.get_many(1, block=False)[0]
+
+    def _pop_many(self, count):
+        if self.maxsize:
+            return self._pop_bounded("ZPOPMIN", count)[::2]
+        popped = self.client.execute_command("ZPOPMIN", self.name, count)
+        return popped[::2]
+
+    def put(self, item, priority=0, block=False, timeout=None):
+        """Put an item with priority ``priority`` into the queue.
+
+        See :meth:`Queue.put`.
+
+        """
+        self.put_many([(item, priority)], block, timeout)
+
+    def put_many(self, items, block=False, timeout=None):
+        """Put several items into the queue.
+
+        :param items: Iterable of ``(item, priority)`` tuples.
+
+        See :meth:`Queue.put_many`.
+
+        """
+        if not self.maxsize:
+
+            def zadd_args(chunk):
+                values = self._encode_many([item for item, _ in chunk])
+                return [arg for value, (_, priority) in izip(values, chunk)
+                            for arg in (priority, value)]
+
+            self._send_chunks("ZADD", imap(zadd_args,
+                                           chunks(items, self.chunksize)))
+            return
+        items = list(items)
+        values = self._encode_many([item for item, _ in items])
+        self._put_bounded([arg for value, (_, priority) in izip(values, items)
+                                for arg in (priority, value)],
+                          len(set(values)), block, timeout)
+
+
+class DelayedQueue(Type):
+    """Queue of items that are not available until a given time,
+    stored as a sorted set scored by the time the item is due.
+
+    :keyword initial: Initial items in the queue, as an iterable
+        of ``(item, eta)`` tuples.
+
+    **Note:** As with sorted sets, an item can only be present once in
+    the queue: putting an item already in the queue changes its due time.
+
+    """
+
+    def __init__(self, name, client, initial=None, serializer=None):
+        super(DelayedQueue, self).__init__(name, client, serializer)
+        if initial:
+            self.put_many(initial)
+
+    def __len__(self):
+        """``x.__len__() <==> len(x)``"""
+        return self.client.zcard(self.name)
+
+    qsize = __len__
+
+    def put(self, item, eta):
+        """Put an item into the queue, not to be available before
+        ``eta`` (a :class:`~datetime.datetime` or UNIX timestamp)."""
+        return self.put_many([(item, eta)])
+
+    def put_many(self, items):
+        """Put several items into the queue.
+
+        :param items: Iterable of ``(item, eta)`` tuples.
+
+        """
+
+        def zadd_args(chunk):
+            values = self._encode_many([item for item, _ in chunk])
+            return [arg for value, (_, eta) in izip(values, chunk)
+                        for arg in (maybe_datetime(eta), value)]
+
+        return sum(self._send_chunks("ZADD", imap(zadd_args,
+                                        chunks(items, self.chunksize))))
+
+    def next_due(self):
+        """Return the UNIX timestamp of the next item due, or ``None``
+        if the queue is empty."""
+        first = self.client.zrange(self.name, 0, 0, withscores=True)
+        if first:
+            return first[0][1]
+
+    def claim(self, max_items=None, now=None):
+        """Remove and return the items that are due, in the order
+        they are due.
+
+        :keyword max_items: Maximum number of items to claim.
+            Default is to claim all items due.
+        :keyword now: Claim items due at this time
+            (a :class:`~datetime.datetime` or UNIX timestamp).
+            Default is the current time.
+
+        The items are claimed atomically, so an item is only
+        claimed by one of several concurrent consumers.
+
+        """
+        return self._decode_many(self._claim(max_items, now))
+
+    def forward(self, queue, max_items=None, now=None):
+        """Atomically move the items that are due to the
+        :class:`Queue` ``queue``.
+
+        The items are moved as they are stored, so ``queue`` must
+        use the same serializer, and any ``maxsize`` of ``queue`` is
+        not respected.  Returns the number of items moved.
+
+        See :meth:`claim`.
+
+        """
+        return len(self._claim(max_items, now, queue.name))
+
+    def _claim(self, max_items=None, now=None, destination=None):
+        now = maybe_datetime(now) if now is not None else time.time()
+        keys = [self.name] + (destination and [destination] or [])
+        return CLAIM_DUE_SCRIPT(self.client, keys=keys,
+                                args=[now, max_items or -1])
+
+
+class ReliableQueue(Queue):
+    """Variant of :class:`Queue` where items are not lost if
+    the consumer dies before it has finished processing them.
+
+    Items received are atomically moved to a processing list for
+    the consumer, and stays there until they are acknowledged with
+    :meth:`ack` or :meth:`ack_many`.  If a consumer has not been seen
+    for :attr:`visibility_timeout` seconds, :meth:`requeue_stale`
+    (called by any consumer, or a separate process) moves all of its
+    unacknowledged items back to the queue.
+
+    :keyword consumer: Unique name of this consumer.
+        Default is ``"hostname.pid"``.
+    :keyword prefetch: Number of items moved to the processing list
+        for every round trip.  Items not yet returned by :meth:`get`
+        are kept in a local buffer.  Default is ``1``.
+    :keyword visibility_timeout: Number of seconds before the items
+        of a consumer that has not been seen are requeued.
+        Default is ``300``.
+
+    .. attribute:: processing
+
+        The :class:`List` of items being processed by this consumer.
+
+    **Note:** A consumer is seen when it receives or acknowledges
+    items, so consumers processing items for longer than the
+    visibility timeout should call :meth:`heartbeat` periodically.
+
+    """
+    supports_lmove = True
+    visibility_timeout = 300
+
+    def __init__(self, name, client, initial=None, maxsize=0,
+            serializer=None, consumer=None, prefetch=1,
+            visibility_timeout=None):
+        super(ReliableQueue, self).__init__(name, client, initial, maxsize,
+                                            serializer)
+        self.consumer = consumer or "%s.%s" % (socket.gethostname(),
+                                               os.getpid())
+        self.prefetch = prefetch
+        self.visibility_timeout = visibility_timeout or \
+                                    self.visibility_timeout
+        self.consumers = mkey((self.name, "consumers"))
+        self.processing = List((self.name, "processing", self.consumer),
+                               client, serializer=self.serializer)
+        self._prefetched = []
+        self._unacked = []
+        self._last_heartbeat = None
+
+    def get(self, block=True, timeout=None):
+        """Remove and return an item from the queue.
+
+        The item is kept in the processing list until acknowledged.
+        See :meth:`Queue.get`.
+
+        """
+        return self.get_many(1, block, timeout)[0]
+
+    def get_nowait(self):
+        """Remove and return an item from the queue without blocking.
+
+        :raises Queue.Empty: if an item is not immediately available.
+
+        """
+        return self.get(block=False)
+
+    def get_many(self, max_items, block=True, timeout=None):
+        """Remove and return up to ``max_items`` items from the queue.
+
+        The items are kept in the processing list until acknowledged.
+        See :meth:`Queue.get_many`.
+
+        """
+        if len(self._prefetched) < max_items:
+            wanted = max(max_items, self.prefetch) - len(self._prefetched)
+            try:
+                self._prefetched.extend(self._move(wanted,
+                                        block and not self._prefetched,
+                                        timeout))
+            except Empty:
+                if not self._prefetched:
+                    raise
+        raw = self._prefetched[:max_items]
+        del(self._prefetched[:max_items])
+        items = self._decode_many(raw)
+        self._unacked.extend(izip(items, raw))
+        return items
+
+    def _move(self, count, block=True, timeout=None):
+        # Every move also sends a heartbeat, in the same command or
+        # pipeline, so the items moved are always in the processing list
+        # of a registered consumer, even if requeue_stale removed it.
+        moved = self._move_many(count)
+        if not moved and block:
+            item = self._bmove(timeout)
+            if item is None:
+                raise Empty()
+            self._signal_space(1)
+            moved = [item]
+            if count > 1:
+                moved.extend(self._move_many(count - 1))
+        if not moved:
+            raise Empty()
+        return moved
+
+    def _move_many(self, count):
+        now = time.time()
+        if self.maxsize:
+            moved = self._pop_bounded("RPOPLPUSH", count,
+                            keys=[self.processing.name, self.consumers],
+                            args=[now, self.consumer])
+        else:
+            moved = MULTIMOVE_SCRIPT(self.client,
+                            keys=[self.name, self.processing.name,
+                                  self.consumers],
+                            args=[count, now, self.consumer])
+        self._last_heartbeat = now
+        return moved
+
+    def _bmove(self, timeout=None):
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        if self.supports_lmove:
+            pipe.execute_command("BLMOVE", self.name, self.processing.name,
+                                 "RIGHT", "LEFT", timeout or 0)
+        else:
+            # BRPOPLPUSH only takes whole seconds, and 0 blocks forever.
+            if timeout:
+                timeout = max(1, int(math.ceil(timeout)))
+            pipe.brpoplpush(self.name, self.processing.name,
+                            timeout=timeout or 0)
+        pipe.execute_command("ZADD", self.consumers, now, self.consumer)
+        try:
+            item, _ = pipe.execute()
+        except ResponseError, exc:
+            if not self.supports_lmove or \
+                    "unknown command" not in str(exc).lower():
+                raise
+            self.supports_lmove = False
+            return self._bmove(timeout)
+        self._last_heartbeat = now
+        # the heartbeat has the time before blocking, so resend it
+        # if it was long ago.
+        self.heartbeat()
+        return item
+
+    def ack(self, item):
+        """Acknowledge that ``item`` has been processed, removing it
+        from the processing list."""
+        return self.ack_many([item])
+
+    def ack_many(self, items):
+        """Acknowledge that several items has been processed, removing
+        them from the processing list in a single round trip."""
+        pipe = self.client.pipeline(transaction=False)
+        for item in items:
+            pipe.execute_command("LREM", self.processing.name, 1,
+                                 self._pop_unacked(item))
+        removed = sum(pipe.execute())
+        self.heartbeat()
+        return removed
+
+    def _pop_unacked(self, item):
+        for match in (lambda x: x is item, lambda x: x == item):
+            for i, (unacked, raw) in enumerate(self._unacked):
+                if match(unacked):
+                    del(self._unacked[i])
+                    return raw
+        return self._encode(item)
+
+    def heartbeat(self, force=False):
+        """Tell other consumers that this consumer is still alive.
+
+        Unless ``force`` is set, the heartbeat is only sent if one has
+        not been sent in the last third of :attr:`visibility_timeout`.
+
+        """
+        now = time.time()
+        if force or self._last_heartbeat is None or \
+                now - self._last_heartbeat > self.visibility_timeout / 3.0:
+            self.client.execute_command("ZADD", self.consumers,
+                                        now, self.consumer)
+            self._last_heartbeat = now
+
+    def requeue_stale(self):
+        """Move the unacknowledged items of all consumers not seen
+        for :attr:`visibility_timeout` seconds back to the queue.
+
+        Returns the number of items requeued.
+
+        """
+        cutoff = time.time() - self.visibility_timeout
+        consumers = self.client.zrangebyscore(self.consumers, "-inf", cutoff)
+        if not consumers:
+            return 0
+        return REQUEUE_SCRIPT(self.client,
+                    keys=[self.name, self.consumers] +
+                         [mkey((self.name, "processing", consumer))
+                            for consumer in consumers],
+                    args=[cutoff] + consumers)
+
+
 class Int(Type):
     """In order to mimic an int, we reimplement all its methods with
     all values accessing the backing store.
@@ -557,7 +2332,14 @@ class Int(Type):
     with types that are not int (including itself).
 
     I am not at all convinced this was worth it.
+
+    In-place operations are executed atomically on the server in one
+    round-trip.  Operations other than addition and subtraction use a
+    Lua script, where values are exact up to ``2 ** 53``.  In-place true
+    division raises :exc:`TypeError`, use :class:`Float` instead.
     """
+    mode = "int"
+
     def __add__(self, other):
         return type(other).__radd__(other, self.__int__())
 
@@ -651,47 +2433,47 @@ class Int(Type):
         return self
 
     def __imul__(self, other):
-        self.client.set(self.name, int.__mul__(self.__int__(), other))
+        self._apply("mul", other)
         return self
 
     def __idiv__(self, other):
-        self.client.set(self.name, int.__div__(self.__int__(), other))
+        self._apply("floordiv", other)
         return self
 
     def __itruediv__(self, other):
-        self.client.set(self.name, int.__truediv__(self.__int__(), other))
-        return self
+        raise TypeError("true division would store a float in an Int, "
+                        "use //= or redish.types.Float instead")
 
     def __ifloordiv__(self, other):
-        self.client.set(self.name, int.__floordiv__(self.__int__(), other))
+        self._apply("floordiv", other)
         return self
 
     def __imod__(self, other):
-        self.client.set(self.name, int.__mod__(self.__int__(), other))
+        self._apply("mod", other)
         return self
 
     def __ipow__(self, other):
-        self.client.set(self.name, int.__pow__(self.__int__(), other))
+        self._apply("pow", other)
         return self
 
     def __iand__(self, other):
-        self.client.set(self.name, int.__and__(self.__int__(), other))
+        self._apply("and", other)
         return self
 
     def __ior__(self, other):
-        self.client.set(self.name, int.__or__(self.__int__(), other))
+        self._apply("or", other)
         return self
 
     def __ixor__(self, other):
-        self.client.set(self.name, int.__xor__(self.__int__(), other))
+        self._apply("xor", other)
         return self
 
     def __ilshift__(self, other):
-        self.client.set(self.name, int.__lshift__(self.__int__(), other))
+        self._apply("lshift", other)
         return self
 
     def __irshift__(self, other):
-        self.client.set(self.name, int.__rshift__(self.__int__(), other))
+        self._apply("rshift", other)
         return self
 
     def __neg__(self):
@@ -715,6 +2497,23 @@ class Int(Type):
     def __complex__(self):
         return int.__complex__(self.__int__())
 
+    def _apply(self, op, other):
+        """Apply the operation ``op`` atomically on the server,
+        and return the new value."""
+        if op in ("floordiv", "truediv", "mod") and not other:
+            raise ZeroDivisionError("%s by zero" % (op, ))
+        if op in ("lshift", "rshift") and other < 0:
+            raise ValueError("negative shift count")
+        if isinstance(other, (float, Float)):
+            other = repr(float(other))
+        else:
+            other = str(int(other))
+        result = NUMBER_OP_SCRIPT(self.client, keys=[self.name],
+                                  args=[op, other, self.mode])
+        if self.mode == "int":
+            return int(result)
+        return float(result)
+
     def __int__(self):
         return int(self.client.get(self.name))
 
@@ -723,25 +2522,513 @@ class Int(Type):
 
     copy = __int__
 
+
+class Float(Int):
+    """Float counterpart of :class:`Int`.
+
+    In-place addition and subtraction use ``INCRBYFLOAT``, other
+    in-place operations are applied atomically using a Lua script.
+
+    """
+    mode = "float"
+
+    def __iadd__(self, other):
+        self.client.execute_command("INCRBYFLOAT", self.name, other)
+        return self
+
+    def __isub__(self, other):
+        self.client.execute_command("INCRBYFLOAT", self.name, -other)
+        return self
+
+    def __idiv__(self, other):
+        self._apply("truediv", other)
+        return self
+    __itruediv__ = __idiv__
+
+    def _unsupported(self, other):
+        raise TypeError("unsupported operand type for float")
+    __and__ = __or__ = __xor__ = __lshift__ = __rshift__ = _unsupported
+    __rand__ = __ror__ = __rxor__ = __rlshift__ = __rrshift__ = _unsupported
+    __iand__ = __ior__ = __ixor__ = __ilshift__ = __irshift__ = _unsupported
+
+    def __neg__(self):
+        return -self.__float__()
+
+    def __pos__(self):
+        return self.__float__()
+
+    def __abs__(self):
+        return abs(self.__float__())
+
+    def __complex__(self):
+        return complex(self.__float__())
+
+    def __float__(self):
+        return float(self.client.get(self.name))
+
+    def __int__(self):
+        return int(self.__float__())
+
+    def __repr__(self):
+        return repr(float(self))
+
+    copy = __float__
+
+
+def _float_operator(op, reflected=False):
+    if reflected:
+        return lambda self, other: op(other, self.__float__())
+    return lambda self, other: op(self.__float__(), other)
+
+for _name, _op in (("add", operator.add), ("sub", operator.sub),
+                   ("mul", operator.mul), ("div", operator.div),
+                   ("truediv", operator.truediv),
+                   ("floordiv", operator.floordiv), ("mod", operator.mod),
+                   ("divmod", divmod), ("pow", pow)):
+    setattr(Float, "__%s__" % (_name, ), _float_operator(_op))
+    setattr(Float, "__r%s__" % (_name, ), _float_operator(_op, True))
+
+
+#: Counter buffers with pending increments to flush at exit.
+_counter_buffers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_counter_buffers():
+    for buffer in list(_counter_buffers):
+        buffer.flush()
+
+
+def _counter_flusher(ref, interval):
+    """Flush the :class:`CounterBuffer` ``ref`` refers to when its
+    :attr:`~CounterBuffer.flush_interval` has passed, until the buffer
+    is garbage collected."""
+    while True:
+        time.sleep(interval)
+        buffer = ref()
+        if buffer is None:
+            return
+        if buffer.pending and \
+                time.time() - buffer._last_flush >= buffer.flush_interval:
+            try:
+                buffer.flush()
+            except Exception:
+                pass  # the increments are kept, and retried later.
+        del(buffer)
+
+
+class CounterBuffer(object):
+    """Buffer of counter increments, sent to the server in bulk.
+
+    Increments are accumulated locally, and sent as ``INCRBY`` commands
+    in a single pipeline when :attr:`flush_interval` seconds has passed
+    since the last flush (checked by a background thread), or
+    :attr:`flush_size` increments are buffered, and when the process
+    exits.
+
+    :param client: The redis-py client used to send the increments.
+    :keyword flush_interval: Default is ``1.0`` seconds.
+    :keyword flush_size: Default is ``10000`` increments.
+
+    .. attribute:: values
+
+        The value of every counter returned by the last flush, as
+        ``(value, timestamp)`` tuples.
+
+    """
+    flush_interval = 1.0
+    flush_size = 10000
+
+    def __init__(self, client, flush_interval=None, flush_size=None):
+        self.client = client
+        self.flush_interval = flush_interval or self.flush_interval
+        self.flush_size = flush_size or self.flush_size
+        self.pending = {}
+        self.values = {}
+        self._count = 0
+        self._last_flush = time.time()
+        self._mutex = threading.Lock()
+        self._flusher = None
+        _counter_buffers.add(self)
+
+    def incr(self, name, amount=1):
+        """Increment the counter ``name`` by ``amount``."""
+        with self._mutex:
+            self.pending[name] = self.pending.get(name, 0) + amount
+            self._count += 1
+            due = self._count >= self.flush_size or \
+                    time.time() - self._last_flush >= self.flush_interval
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=_counter_flusher,
+                        args=(weakref.ref(self),
+                              min(self.flush_interval, 1.0) / 2))
+                self._flusher.setDaemon(True)
+                self._flusher.start()
+        if due:
+            self.flush()
+
+    def get_pending(self, name):
+        """Return the sum of the increments not yet sent for ``name``."""
+        return self.pending.get(name, 0)
+
+    def flush(self):
+        """Send all buffered increments to the server."""
+        with self._mutex:
+            pending, self.pending = self.pending, {}
+            self._count = 0
+            self._last_flush = time.time()
+        if not pending:
+            return
+        names = pending.keys()
+        pipe = self.client.pipeline(transaction=False)
+        for name in names:
+            pipe.execute_command("INCRBY", name, pending[name])
+        try:
+            results = pipe.execute()
+        except Exception:
+            with self._mutex:
+                for name, amount in pending.iteritems():
+                    self.pending[name] = self.pending.get(name, 0) + amount
+            raise
+        now = time.time()
+        for name, value in izip(names, results):
+            self.values[name] = (value, now)
+
+
+class BufferedInt(Int):
+    """Variant of :class:`Int` where in-place addition and subtraction
+    are buffered locally, see :class:`CounterBuffer`.
+
+    :keyword buffer: The :class:`CounterBuffer` to use.
+        Default is to create a new buffer for this counter.
+    :keyword staleness: Number of seconds the value read from the server
+        can be cached.  Buffered increments not yet sent are always
+        included in the value.  Default is ``1.0``.
+
+    Other in-place operations flush the buffer first.
+
+    """
+    staleness = 1.0
+
+    def __init__(self, name, client, buffer=None, staleness=None):
+        super(BufferedInt, self).__init__(name, client)
+        self.buffer = buffer or CounterBuffer(client)
+        if staleness is not None:
+            self.staleness = staleness
+        self._cached = None
+        self._cached_at = None
+
+    def __iadd__(self, other):
+        self.buffer.incr(self.name, other)
+        return self
+
+    def __isub__(self, other):
+        self.buffer.incr(self.name, -other)
+        return self
+
+    def flush(self):
+        """Send the buffered increments to the server."""
+        self.buffer.flush()
+
+    def __int__(self):
+        known = self.buffer.values.get(self.name)
+        if known and (self._cached_at is None or known[1] > self._cached_at):
+            self._cached, self._cached_at = known
+        if self._cached is None or \
+                time.time() - self._cached_at > self.staleness:
+            self._cached = int(self.client.get(self.name) or 0)
+            self._cached_at = time.time()
+        return self._cached + self.buffer.get_pending(self.name)
+
+    copy = __int__
+
+
+def _flushing(name):
+    method = getattr(Int, name)
+
+    def flushing(self, other):
+        self.flush()
+        try:
+            return method(self, other)
+        finally:
+            self._cached, self._cached_at = None, time.time()
+    flushing.__name__ = name
+    flushing.__doc__ = method.__doc__
+    return flushing
+
+for _name in ("__imul__", "__idiv__", "__itruediv__", "__ifloordiv__",
+              "__imod__", "__ipow__", "__iand__", "__ior__", "__ixor__",
+              "__ilshift__", "__irshift__"):
+    setattr(BufferedInt, _name, _flushing(_name))
+
+
+class StripedCounter(Type):
+    """Counter spreading increments over several keys.
+
+    Every increment goes to one of :attr:`stripes` keys (named
+    ``"<name>:<stripe>"``), chosen by the current process and thread,
+    so concurrent writers rarely touch the same key.  The value is
+    the sum of all the stripes, read using a single ``MGET``.
+
+    :keyword stripes: Number of keys to use.  Default is ``16``.
+    :keyword staleness: Number of seconds the total can be cached.
+        Default is to always read the total from the server.
+
+    """
+    stripes = 16
+    staleness = None
+
+    def __init__(self, name, client, stripes=None, staleness=None):
+        super(StripedCounter, self).__init__(name, client)
+        self.stripes = stripes or self.stripes
+        if staleness is not None:
+            self.staleness = staleness
+        self.keys = ["%s:%s" % (self.name, stripe)
+                        for stripe in xrange(self.stripes)]
+        self._total = None
+        self._total_at = None
+
+    def _stripe(self):
+        return hash((os.getpid(), thread.get_ident())) % self.stripes
+
+    def incr(self, amount=1):
+        """Increment the counter by ``amount``."""
+        self.client.incr(self.keys[self._stripe()], amount)
+        if self._total is not None:
+            self._total += amount
+
+    def decr(self, amount=1):
+        """Decrement the counter by ``amount``."""
+        self.incr(-amount)
+
+    def __iadd__(self, other):
+        self.incr(other)
+        return self
+
+    def __isub__(self, other):
+        self.incr(-other)
+        return self
+
+    def total(self):
+        """Return the sum of all the stripes."""
+        if self._total is not None and self.staleness and \
+                time.time() - self._total_at <= self.staleness:
+            return self._total
+        total = sum(int(value) for value in self.client.mget(self.keys)
+                        if value is not None)
+        self._total, self._total_at = total, time.time()
+        return total
+
+    def clear(self):
+        """Remove all the stripes."""
+        self._total = None
+        return self.client.delete(*self.keys)
+
+    def __int__(self):
+        return self.total()
+
+    def __long__(self):
+        return long(self.total())
+
+    def __float__(self):
+        return float(self.total())
+
+    def __repr__(self):
+        return "<StripedCounter: %s=%s>" % (self.name, self.total())
+
+    copy = total
+
+
 def is_zsettable(s):
     """quick check that all values in a dict are reals"""
     return all(map(lambda x: isinstance(x, (int, float, long)), s.values()))
 
 
+class _SortedList(object):
+    """Sorted list of values, stored as a list of sorted blocks.
+
+    Blocks are split when they grow larger than twice :attr:`load`,
+    and the positions of the blocks are kept in a Fenwick tree,
+    so inserting, removing, ranking and locating values is ``O(log n)``
+    (plus moving at most ``2 * load`` items within a block).
+
+    """
+    load = 500
+
+    def __init__(self, iterable=()):
+        values = sorted(iterable)
+        self._lists = [values[i:i + self.load]
+                            for i in xrange(0, len(values), self.load)]
+        self._maxes = [block[-1] for block in self._lists]
+        self._tree = None
+        self._len = len(values)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._lists:
+            for value in block:
+                yield value
+
+    def _build_tree(self):
+        tree = [len(block) for block in self._lists]
+        for i in xrange(len(tree)):
+            j = i | (i + 1)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+        return tree
+
+    def _tree_add(self, pos, delta):
+        tree = self._tree
+        if tree is not None:
+            while pos < len(tree):
+                tree[pos] += delta
+                pos |= pos + 1
+
+    def _offset(self, pos):
+        """Number of values in the blocks before block ``pos``."""
+        tree = self._tree or self._build_tree()
+        total = 0
+        while pos > 0:
+            total += tree[pos - 1]
+            pos &= pos - 1
+        return total
+
+    def _locate(self, index):
+        """Return the ``(block, position)`` of the value at ``index``."""
+        tree = self._tree or self._build_tree()
+        pos, step = 0, 1
+        while step * 2 <= len(tree):
+            step *= 2
+        while step:
+            if pos + step <= len(tree) and tree[pos + step - 1] <= index:
+                pos += step
+                index -= tree[pos - 1]
+            step //= 2
+        return pos, index
+
+    def add(self, value):
+        """Insert ``value``, keeping the list sorted."""
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._tree = None
+        else:
+            pos = bisect.bisect_right(self._maxes, value)
+            if pos == len(self._maxes):
+                pos -= 1
+                self._lists[pos].append(value)
+                self._maxes[pos] = value
+            else:
+                bisect.insort(self._lists[pos], value)
+            block = self._lists[pos]
+            if len(block) > self.load * 2:
+                self._lists[pos:pos + 1] = [block[:self.load],
+                                            block[self.load:]]
+                self._maxes[pos:pos + 1] = [block[self.load - 1], block[-1]]
+                self._tree = None
+            else:
+                self._tree_add(pos, 1)
+        self._len += 1
+
+    def remove(self, value):
+        """Remove ``value``.
+
+        :raises ValueError: if the value is not present.
+
+        """
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            raise ValueError(value)
+        block = self._lists[pos]
+        index = bisect.bisect_left(block, value)
+        if block[index] != value:
+            raise ValueError(value)
+        del(block[index])
+        self._len -= 1
+        if not block:
+            del(self._lists[pos])
+            del(self._maxes[pos])
+            self._tree = None
+        else:
+            self._maxes[pos] = block[-1]
+            self._tree_add(pos, -1)
+
+    def bisect_left(self, value):
+        """Return the index where ``value`` would be inserted,
+        before any equal values."""
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos) + bisect.bisect_left(self._lists[pos],
+                                                      value)
+
+    def index(self, value):
+        """Return the index of ``value``.
+
+        :raises ValueError: if the value is not present.
+
+        """
+        index = self.bisect_left(value)
+        if index == self._len or self[index] != value:
+            raise ValueError(value)
+        return index
+
+    def iterfrom(self, index):
+        """Iterate over the values, starting at ``index``."""
+        if index >= self._len:
+            return
+        pos, start = self._locate(index)
+        for value in self._lists[pos][start:]:
+            yield value
+        for block in self._lists[pos + 1:]:
+            for value in block:
+                yield value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            return list(islice(self.iterfrom(start), max(stop - start, 0)))
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        pos, index = self._locate(index)
+        return self._lists[pos][index]
+
+
 class ZSet(object):
-    """The simplest local implementation to Redis's Sorted Set imaginable.
-    Little thought given to performance, simply get the basic implementation
-    right."""
-    def __init__(self, initial={}):
+    """Local implementation of Redis's Sorted Set.
+
+    Members are kept in a dictionary of scores, and indexed by
+    ``(score, member)`` in a sorted list, so adding, removing and
+    ranking members, and score range queries, are ``O(log n)``.
+    """
+    def __init__(self, initial=None):
+        initial = dict(initial or {})
         if not is_zsettable(initial):
             raise ValueError(initial)
         self._dict = initial
+        self._index = _SortedList((score, member)
+                            for member, score in initial.iteritems())
 
     def items(self):
-        return sorted(self._dict.items(), key=lambda x: (x[1], x[0]))
+        """Return the ``(member, score)`` pairs, ordered by score."""
+        return list(self.iteritems())
+
+    def iteritems(self):
+        """Iterate over the ``(member, score)`` pairs, ordered by score."""
+        for score, member in self._index:
+            yield member, score
 
     def __getitem__(self, s):
-        return self._as_set()[s]
+        if isinstance(s, slice):
+            return [member for _, member in self._index[s]]
+        return self._index[s][1]
 
     def __len__(self):
         """``x.__len__() <==> len(x)``"""
@@ -749,7 +3036,12 @@ class ZSet(object):
 
     def __iter__(self):
         """``x.__iter__() <==> iter(x)``"""
-        return iter(self._as_set())
+        for _, member in self._index:
+            yield member
+
+    def __contains__(self, member):
+        """``x.__contains__(member) <==> member in x``"""
+        return member in self._dict
 
     def __repr__(self):
         """``x.__repr__() <==> repr(x)``"""
@@ -758,24 +3050,29 @@ class ZSet(object):
     def add(self, member, score):
         """Add the specified member to the sorted set, or update the score
         if it already exist."""
+        if member in self._dict:
+            self._index.remove((self._dict[member], member))
         self._dict[member] = score
+        self._index.add((score, member))
 
     def remove(self, member):
         """Remove member."""
-        del self._dict[member]
+        self._index.remove((self._dict.pop(member), member))
 
     def discard(self, member):
         if member in self._dict:
-            del self._dict[member]
+            self.remove(member)
 
     def increment(self, member, amount=1):
         """Increment the score of ``member`` by ``amount``."""
-        self._dict[member] += amount
+        self.add(member, self._dict[member] + amount)
         return self._dict[member]
 
     def rank(self, member):
         """Rank the set with scores being ordered from low to high."""
-        return self._as_set().index(member)
+        if member not in self._dict:
+            raise ValueError(member)
+        return self._index.index((self._dict[member], member))
 
     def revrank(self, member):
         """Rank the set with scores being ordered from high to low."""
@@ -785,14 +3082,16 @@ class ZSet(object):
         """Return the score associated with the specified member."""
         return self._dict[member]
 
-    def range_by_score(self, min, max):
+    def range_by_score(self, min, max, withscores=False):
         """Return all the elements with score >= min and score <= max
         (a range query) from the sorted set."""
-        data = self.items()
-        keys = [r[1] for r in data] 
-        start = bisect.bisect_left(keys, min)
-        end = bisect.bisect_right(keys, max, start)
-        return self._as_set()[start:end]
+        members = []
+        for score, member in self._index.iterfrom(
+                                        self._index.bisect_left((min, ))):
+            if score > max:
+                break
+            members.append(withscores and (member, score) or member)
+        return members
 
     def _as_set(self):
-        return map(lambda x: x[0], self.items())
+        return list(self)
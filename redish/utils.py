@@ -1,5 +1,9 @@
 import time
+from hashlib import sha1
 from datetime import datetime
+from itertools import islice
+
+from redis.exceptions import ResponseError
 
 
 def maybe_list(value):
@@ -14,6 +18,20 @@ def mkey(names):
     return ":".join(maybe_list(names))
 
 
+def chunks(iterable, size):
+    """Split an iterable into lists of at most ``size`` items.
+
+    The iterable is consumed lazily, so this can be used with generators.
+
+    """
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def dt_to_timestamp(dt):
     """Convert :class:`datetime` to UNIX timestamp."""
     return time.mktime(dt.timetuple())
@@ -24,3 +42,46 @@ def maybe_datetime(timestamp):
     if isinstance(timestamp, datetime):
         return dt_to_timestamp(timestamp)
     return timestamp
+
+
+class Script(object):
+    """A Lua script run on the server.
+
+    The script is executed by its SHA1 digest using ``EVALSHA``,
+    and is only sent to the server (using ``EVAL``) if it has not
+    been cached already.
+
+    :param source: The Lua source code of the script.
+
+    Example::
+
+        >>> incr = Script("return redis.call('INCRBY', KEYS[1], ARGV[1])")
+        >>> incr(client, keys=["counter"], args=[10])
+        10
+
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.sha = sha1(source).hexdigest()
+
+    def __call__(self, client, keys=(), args=()):
+        """Run the script with ``client``.
+
+        If ``client`` is a pipeline the script is sent using ``EVAL``,
+        as a missing script can not be detected until the pipeline
+        is executed.
+
+        """
+        keys = list(keys)
+        argv = [len(keys)] + keys + list(args)
+        if hasattr(client, "command_stack"):
+            return client.execute_command("EVAL", self.source, *argv)
+        try:
+            return client.execute_command("EVALSHA", self.sha, *argv)
+        except ResponseError, exc:
+            # redis-py may strip the NOSCRIPT error code from the message.
+            if "NOSCRIPT" not in str(exc) and \
+                    "No matching script" not in str(exc):
+                raise
+        return client.execute_command("EVAL", self.source, *argv)